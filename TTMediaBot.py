@@ -1,40 +1,51 @@
-from typing import Optional
+from __future__ import annotations
+
+from typing import Optional, TYPE_CHECKING
 
 from os import path
 
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace
+
+if TYPE_CHECKING:
+    from bot.sound_devices import SoundDeviceManager
 
-from bot import Bot, app_vars
-from bot.config import save_default_file
-from bot.sound_devices import SoundDeviceManager
+# O bot só é importado dentro de main(): os workers do yt-dlp são processos "spawn",
+# que reimportam este arquivo e não devem carregar o TeamTalk, o mpv nem ler argv
 
-parser = ArgumentParser()
-parser.add_argument(
-    "-c",
-    "--config",
-    help="Path to the configuration file",
-    default=path.join(app_vars.directory, "config.json"),
-)
-parser.add_argument("-C", "--cache", help="Path to the cache file", default=None)
-parser.add_argument("-l", "--log", help="Path to the log file", default=None)
-parser.add_argument(
-    "--devices", help="Show available devices and exit", action="store_true"
-)
-parser.add_argument(
-    "--default-config",
-    help='Save default config to "config_default.json" and exit',
-    action="store_true",
-)
-args = parser.parse_args()
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-c",
+        "--config",
+        help='Path to the configuration file (default: "config.json" in the bot directory)',
+        default=None,
+    )
+    parser.add_argument("-C", "--cache", help="Path to the cache file", default=None)
+    parser.add_argument("-l", "--log", help="Path to the log file", default=None)
+    parser.add_argument(
+        "--devices", help="Show available devices and exit", action="store_true"
+    )
+    parser.add_argument(
+        "--default-config",
+        help='Save default config to "config_default.json" and exit',
+        action="store_true",
+    )
+    return parser.parse_args()
 
 
 def main(
-    config: str = args.config,
-    cache: Optional[str] = args.cache,
-    log: Optional[str] = args.log,
-    devices: bool = args.devices,
-    default_config: bool = args.default_config,
+    config: Optional[str] = None,
+    cache: Optional[str] = None,
+    log: Optional[str] = None,
+    devices: bool = False,
+    default_config: bool = False,
 ) -> None:
+    from bot import Bot, app_vars
+    from bot.config import save_default_file
+
+    if config is None:
+        config = path.join(app_vars.directory, "config.json")
     if devices:
         bot = Bot(None, None, None)
         echo_sound_devices(bot.sound_device_manager)
@@ -61,4 +72,5 @@ def echo_sound_devices(sound_device_manager: SoundDeviceManager):
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(args.config, args.cache, args.log, args.devices, args.default_config)
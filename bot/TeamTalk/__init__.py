@@ -1,8 +1,10 @@
 from __future__ import annotations
+import ctypes
 import logging
 import os
 import re
 import sys
+import threading
 from typing import AnyStr, List, TYPE_CHECKING, Optional, Union
 from queue import Queue
 
@@ -16,6 +18,9 @@ if sys.platform == "win32":
     else:
         os.chdir(app_vars.directory)
 
+from bot.TeamTalk.command_tracker import CommandTracker
+from bot.TeamTalk.message_scheduler import MessageScheduler
+from bot.TeamTalk.registry import Registry
 from bot.TeamTalk.thread import TeamTalkThread
 from bot.TeamTalk.structs import *
 
@@ -24,6 +29,26 @@ import TeamTalkPy
 
 re_line_endings = re.compile("[\\r\\n]")
 
+user_event_types = (
+    EventType.USER_LOGGEDIN,
+    EventType.USER_LOGGEDOUT,
+    EventType.USER_UPDATE,
+    EventType.USER_JOINED,
+    EventType.USER_LEFT,
+    EventType.STATE_CHANGE,
+)
+channel_event_types = (
+    EventType.CHANNEL_NEW,
+    EventType.CHANNEL_UPDATE,
+    EventType.CHANNEL_REMOVE,
+)
+user_account_event_types = (
+    EventType.MYSELF_LOGGEDIN,
+    EventType.USER_ACCOUNT,
+    EventType.USERACCOUNT_NEW,
+    EventType.USERACCOUNT_REMOVE,
+)
+
 if TYPE_CHECKING:
     from bot import Bot
 
@@ -86,27 +111,34 @@ class TeamTalk:
         self.nickname = self.config.nickname
         self.gender = UserStatusMode.__members__[self.config.gender.upper()]
         self.status = self.default_status
-        self.errors_queue: Queue[Error] = Queue()
-        self.event_success_queue: Queue[Event] = Queue()
-        self.message_queue: Queue[Message] = Queue()
+        self.command_tracker = CommandTracker()
+        self.message_scheduler = MessageScheduler(
+            self._send_text_message,
+            self.command_tracker,
+            self.config.message_rate,
+            self.config.message_burst,
+        )
+        self.message_queue: Queue[Optional[Message]] = Queue()
         self.myself_event_queue: Queue[Event] = Queue()
-        self.uploaded_files_queue: Queue[File] = Queue()
+        self.registry = Registry(self)
         self.thread = TeamTalkThread(bot, self)
         self.reconnect = False
         self.reconnect_attempt = 0
         self.user_account: UserAccount
-        self._joined_channel = False  # Flag para saber se entrou no canal
+        self.joined_channel = threading.Event()  # Marcado quando o bot entra no canal
         self._ready_event = None  # Will be set after joining channel
 
     def initialize(self) -> None:
         logging.debug("Initializing TeamTalk")
         self.thread.start()
+        self.message_scheduler.start()
         self.connect()
         logging.debug("TeamTalk initialized")
 
     def close(self) -> None:
         logging.debug("Closing teamtalk")
         self.thread.close()
+        self.message_scheduler.close()
         self.disconnect()
         self.state = State.NOT_CONNECTED
         self.tt.closeTeamTalk()
@@ -114,6 +146,7 @@ class TeamTalk:
 
     def connect(self) -> None:
         self.state = State.CONNECTING
+        self.registry.clear()
         self.tt.connect(
             _str(self.config.hostname),
             self.config.tcp_port,
@@ -126,6 +159,7 @@ class TeamTalk:
     def disconnect(self) -> None:
         self.tt.disconnect()
         self.state = State.NOT_CONNECTED
+        self.command_tracker.clear()
 
     def login(self) -> None:
         self.tt.doLogin(
@@ -144,8 +178,8 @@ class TeamTalk:
                 logging.warning(f"Channel '{self.config.channel}' not found, falling back to channel 1")
                 channel_id = 1
         logging.info(f"Joining channel ID: {channel_id}")
+        self.joined_channel.clear()  # Será marcado no evento CMD_SUCCESS do join
         self.tt.doJoinChannelByID(channel_id, _str(self.config.channel_password))
-        self._joined_channel = False  # Será definido como True no evento CMD_JOINED_CHANNEL
 
     @property
     def default_status(self) -> str:
@@ -157,19 +191,22 @@ class TeamTalk:
     def send_message(
         self, text: str, user: Optional[User] = None, type: int = 1
     ) -> None:
-        for string in split(text):
-            message = TeamTalkPy.TextMessage()
-            message.nFromUserID = self.tt.getMyUserID()
-            message.nMsgType = type
-            message.szMessage = _str(string)
-            if type == 1:
-                if isinstance(user, int):
-                    message.nToUserID = user
-                else:
-                    message.nToUserID = user.id
-            elif type == 2:
-                message.nChannelID = self.tt.getMyChannelID()
-            self.tt.doTextMessage(message)
+        """Queues a message, MessageScheduler sends it when flood control allows."""
+        recipient = 0
+        if type == 1:
+            recipient = user if isinstance(user, int) else user.id
+        self.message_scheduler.put(split(text), recipient, type)
+
+    def _send_text_message(self, text: str, recipient: int, type: int) -> int:
+        message = TeamTalkPy.TextMessage()
+        message.nFromUserID = self.tt.getMyUserID()
+        message.nMsgType = type
+        message.szMessage = _str(text)
+        if type == 1:
+            message.nToUserID = recipient
+        elif type == 2:
+            message.nChannelID = self.tt.getMyChannelID()
+        return self.tt.doTextMessage(message)
 
     def send_file(self, channel: Union[int, str], file_path: str):
         if isinstance(channel, int):
@@ -215,8 +252,7 @@ class TeamTalk:
         self.tt.doChangeStatus(self.gender.value, _str(self.status))
 
     def get_channel(self, channel_id: int) -> Channel:
-        channel = self.tt.getChannel(channel_id)
-        return self.get_channel_from_obj(channel)
+        return self.registry.get_channel(channel_id)
 
     def get_channel_from_obj(self, obj: TeamTalkPy.Channel) -> Channel:
         try:
@@ -272,24 +308,25 @@ class TeamTalk:
         return self.get_channel(self.tt.getMyChannelID())
 
     def get_user(self, id: int) -> User:
-        user = self.tt.getUser(id)
-        gender = UserStatusMode(user.nStatusMode)
+        return self.registry.get_user(id)
+
+    def get_user_from_obj(self, user: TeamTalkPy.User) -> User:
+        # is_admin e is_banned são calculados pelo Registry
+        username = _str(user.szUsername)
         return User(
             user.nUserID,
             _str(user.szNickname),
-            _str(user.szUsername),
+            username,
             _str(user.szStatusMsg),
-            gender,
+            UserStatusMode(user.nStatusMode),
             UserState(user.uUserState),
             self.get_channel(user.nChannelID),
             _str(user.szClientName),
             user.uVersion,
-            self.get_user_account(_str(user.szUsername)),
+            self.get_user_account(username),
             UserType(user.uUserType),
-            True
-            if _str(user.szUsername) in self.config.users.admins or user.uUserType == 2
-            else False,
-            _str(user.szUsername) in self.config.users.banned_users,
+            False,
+            False,
         )
 
     def get_user_account(self, username: str) -> UserAccount:
@@ -306,54 +343,61 @@ class TeamTalk:
         )
 
     def get_event(self, obj: TeamTalkPy.TTMessage) -> Event:
-        try:
-            channel = self.get_channel_from_obj(obj.channel)
-        except (UnicodeDecodeError, ValueError):
-            channel = Channel(1, "", "", 0, ChannelType.Default)
-        try:
-            error = self.get_error(obj.clienterrormsg.nErrorNo, obj.nSource)
-        except (UnicodeDecodeError, ValueError):
-            error = Error("", ErrorType.Success, 1)
-        try:
-            file = self.get_file(obj.remotefile)
-        except (UnicodeDecodeError, ValueError):
-            file = File(1, "", channel, 0, "")
-        try:
-            user_account = self.get_user_account_by_tt_obj(obj.useraccount)
-        except (UnicodeDecodeError, ValueError):
-            user_account = UserAccount("", "", "", UserType.Null, UserRight.Null, "")
-        try:
-            user = self.get_user(obj.user.nUserID)
-        except (UnicodeDecodeError, ValueError):
-            user = User(
-                1,
-                "",
-                "",
-                "",
-                UserStatusMode.M,
-                UserState.Null,
-                channel,
-                "",
-                1,
-                user_account,
-                UserType.Null,
-                False,
-                False,
-            )
-        try:
-            message = self.get_message(obj.textmessage)
-        except (UnicodeDecodeError, ValueError):
-            message = Message("", user, channel, MessageType.NONE)
-        return Event(
-            EventType(obj.nClientEvent),
-            obj.nSource,
-            channel,
-            error,
-            file,
-            message,
-            user,
-            user_account,
-        )
+        """Decodes only the fields that are meaningful for the event's type."""
+        event = Event(EventType(obj.nClientEvent), obj.nSource)
+        if event.event_type in user_event_types:
+            try:
+                event.user = self.registry.update_user(obj.user)
+            except (UnicodeDecodeError, ValueError):
+                event.user = User(
+                    1,
+                    "",
+                    "",
+                    "",
+                    UserStatusMode.M,
+                    UserState.Null,
+                    Channel(1, "", "", 0, ChannelType.Default),
+                    "",
+                    1,
+                    UserAccount("", "", "", UserType.Null, UserRight.Null, ""),
+                    UserType.Null,
+                    False,
+                    False,
+                )
+            if event.event_type == EventType.USER_LOGGEDOUT:
+                self.registry.remove_user(event.user.id)
+        elif event.event_type in channel_event_types:
+            try:
+                event.channel = self.registry.update_channel(obj.channel)
+            except (UnicodeDecodeError, ValueError):
+                event.channel = Channel(1, "", "", 0, ChannelType.Default)
+            if event.event_type == EventType.CHANNEL_REMOVE:
+                self.registry.remove_channel(event.channel.id)
+        elif event.event_type in (EventType.ERROR, EventType.INTERNAL_ERROR):
+            try:
+                event.error = self.get_error(obj.clienterrormsg.nErrorNo, obj.nSource)
+            except (UnicodeDecodeError, ValueError):
+                event.error = Error("", ErrorType.Success, 1)
+        elif event.event_type in (EventType.FILE_NEW, EventType.FILE_REMOVE):
+            try:
+                event.file = self.get_file(obj.remotefile)
+            except (UnicodeDecodeError, ValueError):
+                event.file = File(1, "", self.get_channel(1), 0, "")
+        elif event.event_type == EventType.USER_TEXT_MESSAGE:
+            try:
+                event.message = self.get_message(obj.textmessage)
+            except (UnicodeDecodeError, ValueError):
+                event.message = Message(
+                    "", self.get_user(1), self.get_channel(1), MessageType.NONE
+                )
+        elif event.event_type in user_account_event_types:
+            try:
+                event.user_account = self.get_user_account_by_tt_obj(obj.useraccount)
+            except (UnicodeDecodeError, ValueError):
+                event.user_account = UserAccount(
+                    "", "", "", UserType.Null, UserRight.Null, ""
+                )
+        return event
 
     def get_input_devices(self) -> List[SoundDevice]:
         devices: List[SoundDevice] = []
@@ -384,6 +428,23 @@ class TeamTalk:
     def set_input_device(self, id: int) -> None:
         self.tt.initSoundInputDevice(id)
 
+    @property
+    def supports_audio_blocks(self) -> bool:
+        return hasattr(self.tt, "insertAudioBlock") and hasattr(TeamTalkPy, "AudioBlock")
+
+    def insert_audio_block(self, data: bytes, sample_rate: int, channels: int) -> bool:
+        """Sends raw s16 PCM as the bot's voice, without a sound input device."""
+        buffer = ctypes.create_string_buffer(data, len(data))
+        block = TeamTalkPy.AudioBlock()
+        block.nStreamID = 1
+        block.nSampleRate = sample_rate
+        block.nChannels = channels
+        block.lpRawAudio = ctypes.cast(buffer, ctypes.c_void_p)
+        block.nSamples = len(data) // (2 * channels)
+        block.uSampleIndex = 0
+        block.uStreamTypes = TeamTalkPy.StreamType.STREAMTYPE_VOICE
+        return bool(self.tt.insertAudioBlock(block))
+
     def enable_voice_transmission(self) -> None:
         self.tt.enableVoiceTransmission(True)
         self.is_voice_transmission_enabled = True
@@ -0,0 +1,155 @@
+from __future__ import annotations
+from concurrent.futures import Future
+from threading import Lock
+import time
+from typing import Any, Dict, Tuple, TYPE_CHECKING
+
+from bot import errors
+from bot.TeamTalk.structs import Error
+
+if TYPE_CHECKING:
+    from bot.TeamTalk.structs import Event, File
+
+
+# Resultados que ninguém reclamou dentro desse tempo são descartados
+UNCLAIMED_RESULT_TTL = 30
+
+
+class CommandTracker:
+    """Hands TeamTalk command results to whoever is waiting for them.
+
+    A caller registers a future for the id returned by a TeamTalk command, and
+    TeamTalkThread completes it when the matching success or error arrives. A result
+    that arrives before its future is registered is kept for UNCLAIMED_RESULT_TTL
+    seconds, and a late result of a cancelled command is dropped for as long.
+    Uploaded files are tracked the same way by file name.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._commands: Dict[int, Future[Event]] = {}
+        self._files: Dict[str, Future[File]] = {}
+        self._unclaimed_commands: Dict[int, Tuple[float, Any]] = {}
+        self._unclaimed_files: Dict[str, Tuple[float, File]] = {}
+        self._cancelled_commands: Dict[int, float] = {}
+        self.expired_count = 0
+
+    def expect(self, command_id: int) -> Future[Event]:
+        """Returns a future that resolves to the success event of a command.
+
+        If the command fails, the future raises errors.TTEventError with the Error.
+        """
+        with self._lock:
+            future = self._commands.get(command_id)
+            if future:
+                return future
+            future = Future()
+            unclaimed = self._unclaimed_commands.pop(command_id, None)
+            if unclaimed:
+                self._set_command_result(future, unclaimed[1])
+            else:
+                self._commands[command_id] = future
+            return future
+
+    def expect_file(self, file_name: str) -> Future[File]:
+        with self._lock:
+            future = self._files.get(file_name)
+            if future:
+                return future
+            future = Future()
+            unclaimed = self._unclaimed_files.pop(file_name, None)
+            if unclaimed:
+                future.set_result(unclaimed[1])
+            else:
+                self._files[file_name] = future
+            return future
+
+    def cancel(self, command_id: int) -> None:
+        """Stops waiting for a command; its result is dropped if it still arrives."""
+        with self._lock:
+            future = self._commands.pop(command_id, None)
+            self._unclaimed_commands.pop(command_id, None)
+            if future and not future.done():
+                self._expire()
+                self._cancelled_commands[command_id] = time.monotonic()
+        if future:
+            future.cancel()
+
+    def cancel_file(self, file_name: str) -> None:
+        with self._lock:
+            future = self._files.pop(file_name, None)
+        if future:
+            future.cancel()
+
+    def complete(self, event: Event) -> None:
+        self._complete_command(event.source, event)
+
+    def fail(self, error: Error) -> None:
+        self._complete_command(error.command_id, error)
+
+    def complete_file(self, file: File) -> None:
+        with self._lock:
+            future = self._files.pop(file.name, None)
+            if not future:
+                self._expire()
+                self._unclaimed_files.pop(file.name, None)
+                self._unclaimed_files[file.name] = (time.monotonic(), file)
+                return
+        future.set_result(file)
+
+    def clear(self) -> None:
+        """Fails every pending future, used when the connection is lost."""
+        with self._lock:
+            futures = list(self._commands.values()) + list(self._files.values())
+            self._commands.clear()
+            self._files.clear()
+            self._unclaimed_commands.clear()
+            self._unclaimed_files.clear()
+            self._cancelled_commands.clear()
+        for future in futures:
+            future.set_exception(errors.ConnectionError())
+
+    def _complete_command(self, command_id: int, result: Any) -> None:
+        with self._lock:
+            future = self._commands.pop(command_id, None)
+            if not future:
+                if self._cancelled_commands.pop(command_id, None) is not None:
+                    return
+                self._expire()
+                self._unclaimed_commands.pop(command_id, None)
+                self._unclaimed_commands[command_id] = (time.monotonic(), result)
+                return
+        self._set_command_result(future, result)
+
+    def _set_command_result(self, future: Future[Event], result: Any) -> None:
+        if future.done():
+            return
+        if isinstance(result, Error):
+            future.set_exception(errors.TTEventError(result))
+        else:
+            future.set_result(result)
+
+    def _expire(self) -> None:
+        deadline = time.monotonic() - UNCLAIMED_RESULT_TTL
+        for unclaimed in (self._unclaimed_commands, self._unclaimed_files):
+            # Os dicts estão em ordem de chegada, então basta olhar o começo
+            while unclaimed:
+                key = next(iter(unclaimed))
+                if unclaimed[key][0] >= deadline:
+                    break
+                del unclaimed[key]
+                self.expired_count += 1
+        while self._cancelled_commands:
+            command_id, cancelled_at = next(iter(self._cancelled_commands.items()))
+            if cancelled_at >= deadline:
+                break
+            del self._cancelled_commands[command_id]
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._commands) + len(self._files),
+            "unclaimed": len(self._unclaimed_commands) + len(self._unclaimed_files),
+            "cancelled": len(self._cancelled_commands),
+            "expired": self.expired_count,
+        }
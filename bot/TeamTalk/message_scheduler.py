@@ -0,0 +1,178 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future
+import logging
+from threading import Condition, Thread
+import time
+from typing import Callable, Deque, Dict, List, TYPE_CHECKING
+
+from bot import app_vars, errors
+from bot.TeamTalk.structs import ErrorType, MessageType
+
+if TYPE_CHECKING:
+    from bot.TeamTalk.command_tracker import CommandTracker
+    from bot.TeamTalk.structs import Event
+
+
+MAX_FLOOD_RETRIES = 5
+FLOOD_BACKOFF = 1.0
+MAX_FLOOD_BACKOFF = 16.0
+
+
+class OutgoingMessage:
+    def __init__(self, text: str, recipient: int, type: int, seq: int) -> None:
+        self.text = text
+        self.recipient = recipient
+        self.type = type
+        # Ordem de chegada, para devolver à fila no lugar certo depois de um flood
+        self.seq = seq
+        self.retries = 0
+
+
+class MessageScheduler(Thread):
+    """Paces outgoing text messages so the server doesn't reject them as a flood.
+
+    Messages are sent through a token bucket of rate messages per second with room
+    for burst messages at once. Direct replies go before channel messages, and small
+    messages to the same recipient waiting in the queue are merged into one.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, int, int], int],
+        command_tracker: CommandTracker,
+        rate: float,
+        burst: int,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.name = "MessageScheduler"
+        self._send = send
+        self.command_tracker = command_tracker
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._backoff = 0.0
+        self._backoff_until = 0.0
+        # Índice 0: mensagens diretas, índice 1: mensagens para o canal
+        self._queues: List[Deque[OutgoingMessage]] = [deque(), deque()]
+        self._condition = Condition()
+        self._close = False
+        self._next_seq = 0
+        self.sent_count = 0
+        self.merged_count = 0
+        self.retried_count = 0
+        self.dropped_count = 0
+
+    def put(self, chunks: List[str], recipient: int, type: int) -> None:
+        with self._condition:
+            queue = self._get_queue(type)
+            for chunk in chunks:
+                if queue:
+                    last_message = queue[-1]
+                    if (
+                        last_message.recipient == recipient
+                        and last_message.type == type
+                        and not last_message.retries
+                        and len(last_message.text) + len(chunk) + 1
+                        <= app_vars.max_message_length
+                    ):
+                        last_message.text += "\n" + chunk
+                        self.merged_count += 1
+                        continue
+                self._next_seq += 1
+                queue.append(OutgoingMessage(chunk, recipient, type, self._next_seq))
+            self._condition.notify()
+
+    def _get_queue(self, type: int) -> Deque[OutgoingMessage]:
+        return self._queues[0 if type == MessageType.User.value else 1]
+
+    def _requeue(self, message: OutgoingMessage) -> None:
+        # A rejeição chega depois de outras mensagens já terem saído da fila; inserir
+        # pela ordem de chegada mantém a sequência quando vários pedaços voltam
+        queue = self._get_queue(message.type)
+        for index, queued_message in enumerate(queue):
+            if queued_message.seq > message.seq:
+                queue.insert(index, message)
+                return
+        queue.append(message)
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._close and not (self._queues[0] or self._queues[1]):
+                    self._condition.wait()
+                if self._close:
+                    break
+                delay = self._get_delay()
+                if delay > 0:
+                    # Novas mensagens não adiantam a fila, só a espera por fichas
+                    self._condition.wait(delay)
+                    continue
+                self._tokens -= 1
+                message = (self._queues[0] or self._queues[1]).popleft()
+            try:
+                command_id = self._send(message.text, message.recipient, message.type)
+            except Exception:
+                logging.error("Failed to send message", exc_info=True)
+                continue
+            self.sent_count += 1
+            if command_id <= 0:
+                continue
+            self.command_tracker.expect(command_id).add_done_callback(
+                lambda future, message=message: self._on_result(future, message)
+            )
+
+    def _get_delay(self) -> float:
+        now = time.monotonic()
+        if now < self._backoff_until:
+            return self._backoff_until - now
+        if self.rate <= 0:
+            return 0
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._last_refill) * self.rate
+        )
+        self._last_refill = now
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    def _on_result(self, future: Future[Event], message: OutgoingMessage) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        with self._condition:
+            if not isinstance(error, errors.TTEventError):
+                self._backoff = 0.0
+                return
+            if error.args[0].type != ErrorType.CommandFlood:
+                return
+            self._backoff = min(
+                self._backoff * 2 if self._backoff else FLOOD_BACKOFF,
+                MAX_FLOOD_BACKOFF,
+            )
+            self._backoff_until = time.monotonic() + self._backoff
+            if message.retries >= MAX_FLOOD_RETRIES:
+                self.dropped_count += 1
+                logging.warning("Dropping message after repeated flood errors")
+                return
+            message.retries += 1
+            self.retried_count += 1
+            self._requeue(message)
+            self._condition.notify()
+
+    def close(self) -> None:
+        with self._condition:
+            self._close = True
+            self._condition.notify()
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queued_messages": len(self._queues[0]) + len(self._queues[1]),
+            "sent_messages": self.sent_count,
+            "merged_messages": self.merged_count,
+            "flood_retries": self.retried_count,
+            "dropped_messages": self.dropped_count,
+            "flood_backoff": self._backoff,
+        }
@@ -0,0 +1,84 @@
+from __future__ import annotations
+from threading import RLock
+from typing import Dict, Tuple, TYPE_CHECKING
+
+from bot.TeamTalk.structs import Channel, User, UserType
+
+if TYPE_CHECKING:
+    import TeamTalkPy
+
+    from bot.TeamTalk import TeamTalk
+
+
+class Registry:
+    """Users and channels known to the bot, kept up to date from TeamTalk events.
+
+    Lookups only reach the SDK for ids that haven't been seen in any event yet.
+    """
+
+    def __init__(self, ttclient: TeamTalk) -> None:
+        self.ttclient = ttclient
+        self.config = ttclient.config
+        self._users: Dict[int, User] = {}
+        self._channels: Dict[int, Channel] = {}
+        self._lock = RLock()
+
+    def get_user(self, id: int) -> User:
+        with self._lock:
+            user = self._users.get(id)
+        if user:
+            return user
+        return self.update_user(self.ttclient.tt.getUser(id))
+
+    def get_channel(self, id: int) -> Channel:
+        with self._lock:
+            channel = self._channels.get(id)
+        if channel:
+            return channel
+        return self.update_channel(self.ttclient.tt.getChannel(id))
+
+    def update_user(self, obj: TeamTalkPy.User) -> User:
+        user = self.ttclient.get_user_from_obj(obj)
+        user.is_admin, user.is_banned = self._get_access(user)
+        if user.id:
+            with self._lock:
+                self._users[user.id] = user
+        return user
+
+    def update_channel(self, obj: TeamTalkPy.Channel) -> Channel:
+        channel = self.ttclient.get_channel_from_obj(obj)
+        if not channel.id:
+            return channel
+        with self._lock:
+            cached_channel = self._channels.get(channel.id)
+            if not cached_channel:
+                self._channels[channel.id] = channel
+                return channel
+            # Usuários guardam referência ao canal, então ele é atualizado no lugar
+            cached_channel.__dict__.update(channel.__dict__)
+            return cached_channel
+
+    def remove_user(self, id: int) -> None:
+        with self._lock:
+            self._users.pop(id, None)
+
+    def remove_channel(self, id: int) -> None:
+        with self._lock:
+            self._channels.pop(id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+            self._channels.clear()
+
+    def refresh_access(self) -> None:
+        """Recomputes admin and banned flags after the lists in the config change."""
+        with self._lock:
+            for user in self._users.values():
+                user.is_admin, user.is_banned = self._get_access(user)
+
+    def _get_access(self, user: User) -> Tuple[bool, bool]:
+        return (
+            user.username in self.config.users.admins or user.type == UserType.Admin,
+            user.username in self.config.users.banned_users,
+        )
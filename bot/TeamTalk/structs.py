@@ -1,4 +1,5 @@
 from enum import Enum, Flag
+from typing import Optional
 
 import TeamTalkPy
 
@@ -378,13 +379,14 @@ class Event:
         self,
         event_type: EventType,
         source: int,
-        channel: Channel,
-        error: Error,
-        file: File,
-        message: Message,
-        user: User,
-        user_account: UserAccount,
+        channel: Optional[Channel] = None,
+        error: Optional[Error] = None,
+        file: Optional[File] = None,
+        message: Optional[Message] = None,
+        user: Optional[User] = None,
+        user_account: Optional[UserAccount] = None,
     ):
+        # Só os campos relevantes para event_type são preenchidos por TeamTalk.get_event
         self.event_type = event_type
         self.source = source
         # ("ttType", INT32),
@@ -40,12 +40,12 @@ class TeamTalkThread(Thread):
                 and self.ttclient.state == State.CONNECTED
             ):
                 logging.warning(f"TeamTalk error: {event.error}")
-                self.ttclient.errors_queue.put(event.error)
+                self.ttclient.command_tracker.fail(event.error)
             elif (
                 event.event_type == EventType.SUCCESS
                 and self.ttclient.state == State.CONNECTED
             ):
-                self.ttclient.event_success_queue.put(event)
+                self.ttclient.command_tracker.complete(event)
             elif (
                 event.event_type == EventType.USER_TEXT_MESSAGE
                 and event.message.type == MessageType.User
@@ -56,7 +56,7 @@ class TeamTalkThread(Thread):
                 and event.file.username == self.config.username
                 and event.file.channel.id == self.ttclient.channel.id
             ):
-                self.ttclient.uploaded_files_queue.put(event.file)
+                self.ttclient.command_tracker.complete_file(event.file)
             elif (
                 event.event_type == EventType.CON_FAILED
                 or event.event_type == EventType.CON_LOST
@@ -116,6 +116,11 @@ class TeamTalkThread(Thread):
                     else:
                         logging.error("Error joining channel - exiting")
                         sys.exit(1)
+            elif (
+                event.event_type in (EventType.USER_JOINED, EventType.USER_LEFT)
+                and self.ttclient.state == State.CONNECTED
+            ):
+                self.bot.check_back_to_root()
             elif event.event_type == EventType.MYSELF_LOGGEDIN:
                 self.ttclient.user_account = event.user_account
                 self.ttclient.reconnect_attempt = 0
@@ -128,7 +133,7 @@ class TeamTalkThread(Thread):
                 self.ttclient.reconnect_attempt = 0
                 self.ttclient.reconnect = True
                 self.ttclient.state = State.CONNECTED
-                self.ttclient._joined_channel = True  # Marcou como Connected = está no canal
+                self.ttclient.joined_channel.set()  # Marcou como Connected = está no canal
                 self.ttclient.change_status_text(self.ttclient.status)
                 current_channel = self.ttclient.channel
                 logging.info(f"Connected to server and joined channel: {current_channel.name} (ID: {current_channel.id})")
@@ -1,6 +1,5 @@
 import os
 import logging
-import queue
 import sys
 import time
 from typing import Optional
@@ -21,7 +20,6 @@ from bot import (
     services,
     sound_devices,
     translator,
-    app_vars,
 )
 
 from bot.player.enums import State
@@ -51,8 +49,11 @@ class Bot:
         self.config = self.config_manager.config
         self.translator = translator.Translator(self.config.general.language)
         try:
+            cache_write_interval = self.config.general.cache_write_interval
             if cache_file_name:
-                self.cache_manager = cache.CacheManager(cache_file_name)
+                self.cache_manager = cache.CacheManager(
+                    cache_file_name, cache_write_interval
+                )
             else:
                 cache_file_name = self.config.general.cache_file_name
                 if not os.path.isdir(
@@ -61,7 +62,9 @@ class Bot:
                     cache_file_name = os.path.join(
                         self.config_manager.config_dir, cache_file_name
                     )
-                self.cache_manager = cache.CacheManager(cache_file_name)
+                self.cache_manager = cache.CacheManager(
+                    cache_file_name, cache_write_interval
+                )
         except PermissionError:
             sys.exit(
                 "The cache file cannot be accessed due to a permission error or is already used by another instance of the bot"
@@ -71,10 +74,15 @@ class Bot:
         self.player = player.Player(self)
         self.ttclient = TeamTalk.TeamTalk(self)
         self.tt_player_connector = connectors.TTPlayerConnector(self)
+        self.pcm_connector: Optional[connectors.PcmConnector] = None
+        if self.config.sound_devices.mode == "pcm":
+            self.pcm_connector = connectors.PcmConnector(self)
         self.sound_device_manager = sound_devices.SoundDeviceManager(self)
         self.service_manager = services.ServiceManager(self)
         self.module_manager = modules.ModuleManager(self)
         self.command_processor = commands.CommandProcessor(self)
+        self._started = False
+        self._close = False
 
     def initialize(self):
         if self.config.logger.log:
@@ -90,23 +98,20 @@ class Bot:
         logging.debug("Starting")
         self.player.run()
         self.tt_player_connector.start()
+        if self.pcm_connector:
+            self.pcm_connector.start()
         self.command_processor.run()
         logging.info("Started")
 
         # Esperar estar conectado E no canal antes de processar comandos de startup
         logging.info("Waiting to join channel...")
         max_wait = 30  # segundos máximos de espera
-        waited = 0
-        while not self.ttclient._joined_channel and waited < max_wait:
-            time.sleep(1)
-            waited += 1
-            if waited % 5 == 0:
-                logging.debug(f"Still waiting to join channel... ({waited}/{max_wait}s)")
-
-        if not self.ttclient._joined_channel:
+        start_time = time.monotonic()
+        if not self.ttclient.joined_channel.wait(max_wait):
             logging.error("Timed out waiting to join channel!")
         else:
-            logging.info(f"Successfully joined channel after {waited} seconds")
+            waited = time.monotonic() - start_time
+            logging.info(f"Successfully joined channel after {waited:.1f} seconds")
 
         logging.info(f"Processing {len(self.config.general.start_commands)} startup command(s)...")
         startup_context_user = User(
@@ -128,31 +133,49 @@ class Bot:
                 self.player.play_queue()
             except (errors.NothingIsPlayingError, errors.NoNextTrackError):
                 pass
-        self._close = False
+        self._started = True
+        self.check_back_to_root()
         while not self._close:
-            root_channel_id = self.config.general.root_channel_id
-            if self.config.general.back_to_root_channel and len(self.ttclient.tt.getChannelUsers(self.ttclient.channel.id))==1 and self.ttclient.channel.id != root_channel_id:
-                if self.player.state != State.Stopped:
-                    self.player.stop()
-                self.ttclient.DoMoveUser(self.ttclient.user.id, root_channel_id)
-            try:
-                message = self.ttclient.message_queue.get_nowait()
-                logging.info(
-                    "New message {text} from {username}".format(
-                        text=message.text, username=message.user.username
-                    )
+            message = self.ttclient.message_queue.get()
+            # None é colocado na fila por close() para acordar este loop
+            if message is None:
+                break
+            logging.info(
+                "New message {text} from {username}".format(
+                    text=message.text, username=message.user.username
                 )
-                self.command_processor(message)
-            except queue.Empty:
-                pass
-            time.sleep(app_vars.loop_timeout)
+            )
+            self.command_processor(message)
+
+    def check_back_to_root(self) -> None:
+        """Moves the bot back to the root channel when it's left alone somewhere else.
+
+        Called by TeamTalkThread whenever a user joins or leaves a channel.
+        """
+        root_channel_id = self.config.general.root_channel_id
+        if (
+            not self._started
+            or self._close
+            or not self.config.general.back_to_root_channel
+            or self.ttclient.channel.id == root_channel_id
+            or len(self.ttclient.tt.getChannelUsers(self.ttclient.channel.id)) != 1
+        ):
+            return
+        if self.player.state != State.Stopped:
+            self.player.stop()
+        self.ttclient.DoMoveUser(self.ttclient.user.id, root_channel_id)
 
     def close(self) -> None:
         logging.debug("Closing bot")
+        self.command_processor.close()
         self.player.close()
         self.ttclient.close()
         self.tt_player_connector.close()
+        if self.pcm_connector:
+            self.pcm_connector.close()
         self.config_manager.close()
         self.cache_manager.close()
+        self.service_manager.close()
         self._close = True
+        self.ttclient.message_queue.put(None)
         logging.info("Bot closed")
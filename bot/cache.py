@@ -1,20 +1,30 @@
 from __future__ import annotations
 
 import json
+import logging
 import os
 import pickle
+import shutil
+import time
 from collections import deque
-from typing import TYPE_CHECKING, Any, Dict, List
+from threading import Event, Lock, RLock, Thread
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
 
 from bot import app_vars
 from bot.migrators import cache_migrator
+from bot.positions import PositionStore
 
 if TYPE_CHECKING:
     from bot.player.track import Track
 
 
 cache_data_type = Dict[str, Any]
+change_type = Tuple[Any, ...]
+journal_record_type = Tuple[int, change_type]
 MAX_QUEUE_SIZE = 1000
+JOURNAL_COMPACTION_THRESHOLD = 500
+SNAPSHOT_PREFIX = "snapshot-"
+snapshot_file_names = ("recents.dat", "favorites.dat", "queue.dat")
 
 
 class Cache:
@@ -33,23 +43,110 @@ class Cache:
         self.queue: List[Track] = (
             cache_data["queue"][:MAX_QUEUE_SIZE] if "queue" in cache_data else []
         )
+        self.journal_seq: int = cache_data.get("journal_seq", 0)
+        self.changes: List[journal_record_type] = []
+        self._lock = RLock()
 
     def add_to_queue(self, track: "Track") -> None:
         """Adiciona track à queue respeitando o limite MAX_QUEUE_SIZE."""
-        self.queue.append(track)
-        if len(self.queue) > MAX_QUEUE_SIZE:
-            self.queue.pop(0)  # Remove o mais antigo (FIFO)
+        self._record(("queue_append", track))
 
     def extend_queue(self, tracks: List["Track"]) -> None:
         """Adiciona múltiplos tracks à queue respeitando o limite."""
-        self.queue.extend(tracks)
-        if len(self.queue) > MAX_QUEUE_SIZE:
-            self.queue = self.queue[-MAX_QUEUE_SIZE:]  # Mantém apenas os mais recentes
+        self._record(("queue_extend", list(tracks)))
+
+    def remove_from_queue(self, index: int = 0) -> None:
+        with self._lock:
+            if index < 0:
+                index += len(self.queue)
+            if not 0 <= index < len(self.queue):
+                raise IndexError(index)
+            self._record(("queue_pop", index))
+
+    def clear_queue(self) -> None:
+        self._record(("queue_clear",))
+
+    def add_to_recents(self, track: "Track") -> None:
+        self._record(("recents_append", track))
+
+    def clear_recents(self) -> None:
+        self._record(("recents_clear",))
+
+    def add_to_favorites(self, username: str, track: "Track") -> None:
+        self._record(("favorites_append", username, track))
+
+    def remove_from_favorites(self, username: str, index: int) -> None:
+        with self._lock:
+            favorites = self.favorites[username]
+            if index < 0:
+                index += len(favorites)
+            if not 0 <= index < len(favorites):
+                raise IndexError(index)
+            self._record(("favorites_pop", username, index))
+
+    def clear_favorites(self) -> None:
+        self._record(("favorites_clear",))
+
+    def clear(self) -> None:
+        self.clear_recents()
+        self.clear_favorites()
+        self.clear_queue()
+
+    def take_changes(self) -> List[journal_record_type]:
+        with self._lock:
+            changes = self.changes
+            self.changes = []
+            return changes
+
+    def _record(self, change: change_type) -> None:
+        with self._lock:
+            self.apply(change)
+            self.journal_seq += 1
+            self.changes.append((self.journal_seq, change))
+
+    def apply(self, change: change_type) -> None:
+        name = change[0]
+        if name == "queue_append":
+            self.queue.append(change[1])
+            if len(self.queue) > MAX_QUEUE_SIZE:
+                self.queue.pop(0)  # Remove o mais antigo (FIFO)
+        elif name == "queue_extend":
+            self.queue.extend(change[1])
+            if len(self.queue) > MAX_QUEUE_SIZE:
+                self.queue = self.queue[-MAX_QUEUE_SIZE:]  # Mantém apenas os mais recentes
+        elif name == "queue_pop":
+            del self.queue[change[1]]
+        elif name == "queue_clear":
+            self.queue.clear()
+        elif name == "recents_append":
+            self.recents.append(change[1])
+        elif name == "recents_clear":
+            self.recents.clear()
+        elif name == "favorites_append":
+            self.favorites.setdefault(change[1], []).append(change[2])
+        elif name == "favorites_pop":
+            del self.favorites[change[1]][change[2]]
+        elif name == "favorites_clear":
+            self.favorites.clear()
+        # Posições agora ficam no PositionStore; estes registros só vêm de journals antigos
+        elif name == "position":
+            for recent_track in reversed(self.recents):
+                if recent_track.url == change[1]:
+                    recent_track.resume_position = change[2]
+                    recent_track.resume_duration = change[3]
+                    break
+        elif name == "positions_clear":
+            for track in self.recents:
+                track.resume_position = None
+                track.resume_duration = None
+        else:
+            raise ValueError("Unknown cache change: {}".format(name))
 
     @property
     def data(self):
         return {
             "cache_version": self.cache_version,
+            "journal_seq": self.journal_seq,
             "recents": self.recents,
             "favorites": self.favorites,
             "queue": self.queue,
@@ -57,20 +154,31 @@ class Cache:
 
 
 class CacheManager:
-    version = 4
+    version = 5
 
-    def __init__(self, file_name: str) -> None:
+    def __init__(self, file_name: str, write_interval: int = 500) -> None:
         self.original_file_name = os.path.abspath(file_name)
         self._prepare_paths(file_name)
         self._ensure_cache_dir()
+        self._journal_length = 0
+        self._save_lock = Lock()
+        self.flush_count = 0
+        self.flushed_changes = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
         try:
             data = cache_migrator.migrate(self, self._load())
             self.cache = Cache(data)
         except FileNotFoundError:
             self.cache = Cache({})
-            self._dump(self.cache.data)
         else:
-            self._dump(self.cache.data)
+            self._replay_journal()
+        self.compact()
+        self.positions = PositionStore(self.cache_dir)
+        if not self.positions.existed:
+            self._import_positions()
+        self.writer = CacheWriter(self, write_interval / 1000)
+        self.writer.start()
 
     def _prepare_paths(self, file_name: str) -> None:
         abs_path = os.path.abspath(file_name)
@@ -79,26 +187,68 @@ class CacheManager:
         else:
             base_dir = os.path.splitext(abs_path)[0]
             self.cache_dir = base_dir
-        self.recents_file = os.path.join(self.cache_dir, "recents.dat")
-        self.favorites_file = os.path.join(self.cache_dir, "favorites.dat")
-        self.queue_file = os.path.join(self.cache_dir, "queue.dat")
         self.meta_file = os.path.join(self.cache_dir, "meta.json")
+        self.journal_file = os.path.join(self.cache_dir, "journal.dat")
 
     def _dump(self, data: cache_data_type):
+        self._write_snapshot(*self._serialize(data))
+
+    def _serialize(
+        self, data: cache_data_type
+    ) -> Tuple[Dict[str, bytes], Dict[str, Any]]:
+        files = {
+            "recents.dat": pickle.dumps(
+                data.get("recents", deque(maxlen=app_vars.recents_max_lenth))
+            ),
+            "favorites.dat": pickle.dumps(data.get("favorites", {})),
+            "queue.dat": pickle.dumps(data.get("queue", [])),
+        }
+        meta = {
+            "cache_version": data.get("cache_version", self.version),
+            "journal_seq": data.get("journal_seq", 0),
+        }
+        return files, meta
+
+    def _write_snapshot(self, files: Dict[str, bytes], meta: Dict[str, Any]) -> None:
+        """Writes the files into a new snapshot directory, then points meta.json at it.
+
+        Replacing meta.json is the only step that publishes the new snapshot, so a
+        crash at any point leaves either the old snapshot or the new one, never a mix.
+        """
         os.makedirs(self.cache_dir, exist_ok=True)
-        with open(self.recents_file, "wb") as f:
-            pickle.dump(data.get("recents", deque(maxlen=app_vars.recents_max_lenth)), f)
-        with open(self.favorites_file, "wb") as f:
-            pickle.dump(data.get("favorites", {}), f)
-        with open(self.queue_file, "wb") as f:
-            pickle.dump(data.get("queue", []), f)
-        with open(self.meta_file, "w", encoding="utf-8") as f:
-            json.dump(
-                {
-                    "cache_version": data.get("cache_version", self.version),
-                },
-                f,
-            )
+        snapshot_name = self._get_new_snapshot_name()
+        snapshot_dir = os.path.join(self.cache_dir, snapshot_name)
+        os.makedirs(snapshot_dir)
+        for file_name, content in files.items():
+            self._write_file(os.path.join(snapshot_dir, file_name), content)
+        meta = dict(meta, snapshot=snapshot_name)
+        self._write_file(self.meta_file, json.dumps(meta).encode("utf-8"))
+        self._remove_old_snapshots(snapshot_name)
+
+    def _write_file(self, file_name: str, content: bytes) -> None:
+        temp_file_name = file_name + ".tmp"
+        with open(temp_file_name, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file_name, file_name)
+
+    def _get_new_snapshot_name(self) -> str:
+        number = time.time_ns()
+        while os.path.exists(
+            os.path.join(self.cache_dir, SNAPSHOT_PREFIX + str(number))
+        ):
+            number += 1
+        return SNAPSHOT_PREFIX + str(number)
+
+    def _remove_old_snapshots(self, current_snapshot: str) -> None:
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(SNAPSHOT_PREFIX) and name != current_snapshot:
+                shutil.rmtree(path, ignore_errors=True)
+            elif name in snapshot_file_names:
+                # Arquivos do formato antigo, que ficavam direto na pasta do cache
+                os.remove(path)
 
     def _load(self) -> cache_data_type:
         try:
@@ -113,14 +263,18 @@ class CacheManager:
             except Exception:
                 f.seek(0)
                 meta = pickle.load(f)
-        with open(self.recents_file, "rb") as f:
+        snapshot_dir = self.cache_dir
+        if meta.get("snapshot"):
+            snapshot_dir = os.path.join(self.cache_dir, meta["snapshot"])
+        with open(os.path.join(snapshot_dir, "recents.dat"), "rb") as f:
             recents = pickle.load(f)
-        with open(self.favorites_file, "rb") as f:
+        with open(os.path.join(snapshot_dir, "favorites.dat"), "rb") as f:
             favorites = pickle.load(f)
-        with open(self.queue_file, "rb") as f:
+        with open(os.path.join(snapshot_dir, "queue.dat"), "rb") as f:
             queue = pickle.load(f)
         return {
             "cache_version": meta.get("cache_version", self.version),
+            "journal_seq": meta.get("journal_seq", 0),
             "recents": recents,
             "favorites": favorites,
             "queue": queue,
@@ -130,11 +284,132 @@ class CacheManager:
         with open(self.original_file_name, "rb") as f:
             return pickle.load(f)
 
+    def _read_journal(self) -> List[journal_record_type]:
+        records: List[journal_record_type] = []
+        try:
+            with open(self.journal_file, "rb") as f:
+                while True:
+                    try:
+                        records.append(pickle.load(f))
+                    except EOFError:
+                        break
+                    except Exception:
+                        # A crash in the middle of an append leaves a truncated tail
+                        logging.warning("Ignoring damaged cache journal tail")
+                        break
+        except FileNotFoundError:
+            pass
+        return records
+
+    def _replay_journal(self) -> None:
+        for seq, change in self._read_journal():
+            if seq <= self.cache.journal_seq:
+                continue
+            try:
+                self.cache.apply(change)
+            except Exception:
+                logging.error("Failed to replay cache change %s", seq, exc_info=True)
+            self.cache.journal_seq = seq
+
+    def _append_journal(self, records: List[journal_record_type]) -> None:
+        with open(self.journal_file, "ab") as f:
+            for record in records:
+                pickle.dump(record, f)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_length += len(records)
+
+    def _import_positions(self) -> None:
+        # Caches antigos guardavam a posição nos próprios Tracks dos recentes
+        for track in self.cache.recents:
+            if getattr(track, "resume_position", None):
+                self.positions.update(
+                    track.position_key,
+                    float(track.resume_position),
+                    float(getattr(track, "resume_duration", None) or 0),
+                )
+
     def _ensure_cache_dir(self):
         os.makedirs(self.cache_dir, exist_ok=True)
 
     def close(self):
-        pass
+        self.writer.close()
+        self.flush()
+        self.positions.close()
+
+    def compact(self) -> None:
+        with self._save_lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        with self.cache._lock:
+            self.cache.take_changes()
+            files, meta = self._serialize(self.cache.data)
+        self._write_snapshot(files, meta)
+        with open(self.journal_file, "wb"):
+            pass
+        self._journal_length = 0
 
     def save(self):
-        self._dump(self.cache.data)
+        """Agenda a gravação das mudanças pendentes no CacheWriter."""
+        self.writer.mark_dirty()
+
+    def flush(self) -> None:
+        with self._save_lock:
+            changes = self.cache.take_changes()
+            if not changes:
+                return
+            start_time = time.monotonic()
+            if self._journal_length + len(changes) >= JOURNAL_COMPACTION_THRESHOLD:
+                self._compact()
+            else:
+                self._append_journal(changes)
+            self.last_flush_latency = time.monotonic() - start_time
+            self.max_flush_latency = max(
+                self.max_flush_latency, self.last_flush_latency
+            )
+            self.flush_count += 1
+            self.flushed_changes += len(changes)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_writes": len(self.cache.changes),
+            "flushes": self.flush_count,
+            "flushed_changes": self.flushed_changes,
+            "journal_length": self._journal_length,
+            "last_flush_ms": round(self.last_flush_latency * 1000, 1),
+            "max_flush_ms": round(self.max_flush_latency * 1000, 1),
+        }
+
+
+class CacheWriter(Thread):
+    def __init__(self, cache_manager: CacheManager, interval: float) -> None:
+        super().__init__(daemon=True)
+        self.name = "CacheWriter"
+        self.cache_manager = cache_manager
+        self.interval = interval
+        self._dirty = Event()
+        self._close = False
+
+    def run(self) -> None:
+        while True:
+            self._dirty.wait()
+            if self._close:
+                break
+            # Agrupa as mudanças que chegarem durante o intervalo numa única escrita
+            time.sleep(self.interval)
+            self._dirty.clear()
+            try:
+                self.cache_manager.flush()
+            except Exception:
+                logging.error("Failed to write cache", exc_info=True)
+
+    def mark_dirty(self) -> None:
+        self._dirty.set()
+
+    def close(self) -> None:
+        self._close = True
+        self._dirty.set()
+        if self.is_alive():
+            self.join()
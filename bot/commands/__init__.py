@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 import logging
+import math
 import re
-from threading import Thread
 from typing import Any, List, TYPE_CHECKING, Tuple
 
 from bot import app_vars, errors
 from bot.TeamTalk.structs import Message, User, UserType
 from bot.commands import admin_commands, user_commands
+from bot.commands.executor import CommandExecutor
+from bot.commands.pagination import Paginator
+from bot.commands.rate_limiter import RateLimiter
 from bot.commands.task_processor import TaskProcessor
 
 re_command = re.compile("[a-z]+")
@@ -20,6 +23,9 @@ if TYPE_CHECKING:
 class CommandProcessor:
     def __init__(self, bot: Bot):
         self.task_processor = TaskProcessor(self)
+        self.executor = CommandExecutor(
+            bot.config.general.command_workers, bot.config.general.command_backlog
+        )
         self.bot = bot
         self.config = bot.config
         self.config_manager = bot.config_manager
@@ -30,6 +36,8 @@ class CommandProcessor:
         self.service_manager = bot.service_manager
         self.ttclient = bot.ttclient
         self.translator = bot.translator
+        self.paginator = Paginator(self.translator, self.config.general.list_page_size)
+        self.rate_limiter = RateLimiter(self.config.general.rate_limit)
         self.locked = False
         self.current_command_id = 0
         self.commands_dict = {
@@ -59,6 +67,7 @@ class CommandProcessor:
             "dl": user_commands.DownloadCommand,
             "r": user_commands.RecentsCommand,
             "q": user_commands.QueueCommand,
+            "pg": user_commands.PageCommand,
         }
         self.admin_commands_dict = {
             "cg": admin_commands.ChangeGenderCommand,
@@ -80,19 +89,35 @@ class CommandProcessor:
             "qq": admin_commands.QuitCommand,
             "quit": admin_commands.QuitCommand,
             "gcid": admin_commands.GetChannelIDCommand,
+            "stats": admin_commands.StatsCommand,
             "sm": admin_commands.OptionShowMetaCommand,
             "br": admin_commands.OptionBackToRootChannelCommand,
             "backc": admin_commands.SetRootChannelCommand,
             "update": admin_commands.UpdateCommand,
             "upd": admin_commands.UpdateCommand,
         }
+        self.update_help_index()
+        self.translator.add_locale_listener(self.update_help_index)
 
     def run(self):
         self.task_processor.start()
+        self.executor.start()
+
+    def close(self) -> None:
+        self.executor.close()
 
     def __call__(self, message: Message) -> None:
-        command_thread = Thread(target=self._run, args=(message,))
-        command_thread.start()
+        # Comandos do mesmo usuário rodam em ordem, um de cada vez
+        if not self.executor.submit(message.user.id, self._run, message):
+            logging.warning(
+                "Command backlog is full, rejecting message from {}".format(
+                    message.user.username
+                )
+            )
+            self.ttclient.send_message(
+                self.translator.translate("The bot is busy, please try again later"),
+                message.user,
+            )
 
     def _run(self, message: Message) -> None:
         parts = [part.strip() for part in message.text.split("|")]
@@ -105,7 +130,7 @@ class CommandProcessor:
         command_name = ""
         try:
             command_name, arg = self.parse_command(text)
-            if self.check_access(message.user, command_name):
+            if self.check_access(message.user, command_name, arg):
                 command_class = self.get_command(command_name, message.user)
                 command = command_class(self)
                 self.current_command_id = id(command)
@@ -140,7 +165,7 @@ class CommandProcessor:
                 message.user,
             )
 
-    def check_access(self, user: User, command: str) -> bool:
+    def check_access(self, user: User, command: str, arg: str = "") -> bool:
         if (
             not user.is_admin and user.type != UserType.Admin
         ) or app_vars.app_name in user.client_name:
@@ -165,8 +190,19 @@ class CommandProcessor:
                 raise errors.AccessDeniedError(
                     self.translator.translate("This command is blocked"),
                 )
-            else:
-                return True
+            rejection = self.rate_limiter.check(user.id, command, arg)
+            if rejection:
+                wait, is_global = rejection
+                if is_global:
+                    message = self.translator.translate(
+                        "The bot is handling too many requests, try again in {} seconds"
+                    )
+                else:
+                    message = self.translator.translate(
+                        "You are sending requests too fast, try again in {} seconds"
+                    )
+                raise errors.AccessDeniedError(message.format(math.ceil(wait)))
+            return True
         else:
             return True
 
@@ -180,25 +216,48 @@ class CommandProcessor:
         else:
             raise errors.UnknownCommandError()
 
+    def update_help_index(self) -> None:
+        """Builds the help texts once, so "h" doesn't create and translate every command.
+
+        Called on startup, when the locale changes and when the blocklist is edited.
+        """
+        help_texts = {
+            name: "{} {}".format(name, command_class(self).help)
+            for name, command_class in self.commands_dict.items()
+        }
+        admin_help_texts = {
+            name: "{} {}".format(name, command_class(self).help)
+            for name, command_class in self.admin_commands_dict.items()
+        }
+        blocked_commands = self.config.general.blocked_commands
+        # Comandos bloqueados não valem para administradores
+        self._help_lines = {
+            False: [
+                text
+                for name, text in help_texts.items()
+                if name not in blocked_commands
+            ],
+            True: list(help_texts.values()) + list(admin_help_texts.values()),
+        }
+        self._help_texts = help_texts
+        self._admin_help_texts = admin_help_texts
+        self.help_tip = self.translator.translate(
+            'Tip: use "|" to chain commands (e.g., "t | v 30")'
+        )
+
     def help(self, arg: str, user: User) -> str:
         if arg:
-            if arg in self.commands_dict:
-                return "{} {}".format(arg, self.commands_dict[arg](self).help)
-            elif user.is_admin and arg in self.admin_commands_dict:
-                return "{} {}".format(arg, self.admin_commands_dict[arg](self).help)
+            if arg in self._help_texts:
+                return self._help_texts[arg]
+            elif user.is_admin and arg in self._admin_help_texts:
+                return self._admin_help_texts[arg]
             else:
                 return self.translator.translate("Unknown command")
         else:
-            help_strings: List[str] = []
-            for i in list(self.commands_dict):
-                help_strings.append(self.help(i, user))
-            if user.is_admin:
-                for i in list(self.admin_commands_dict):
-                    help_strings.append(self.help(i, user))
-            help_strings.append(
-                self.translator.translate('Tip: use "|" to chain commands (e.g., "t | v 30")')
-            )
-            return "\n".join(help_strings)
+            return "\n".join(self.get_help_lines(user) + [self.help_tip])
+
+    def get_help_lines(self, user: User) -> List[str]:
+        return self._help_lines[bool(user.is_admin)]
 
     def parse_command(self, text: str) -> Tuple[str, str]:
         text = text.strip()
@@ -3,17 +3,19 @@ import json
 import os
 import subprocess
 import sys
-import time
+from concurrent import futures
 from typing import Optional, TYPE_CHECKING
-from queue import Empty
 
 from bot.commands.command import Command
 from bot.player.enums import State
-from bot import app_vars, errors
+from bot import errors
 
 if TYPE_CHECKING:
     from bot.TeamTalk.structs import User
 
+
+JOIN_CHANNEL_TIMEOUT = 10
+
 class OptionShowMetaCommand(Command):
     @property
     def help(self) -> str:
@@ -24,9 +26,11 @@ class OptionShowMetaCommand(Command):
     def __call__(self, arg: str, user: User) -> Optional[str]:
         if self.config.general.showmeta:
             self.config.general.showmeta = False
+            self._bot.tt_player_connector.update()
             return self.translator.translate("Metadata display disabled.")
         else:
             self.config.general.showmeta = True
+            self._bot.tt_player_connector.update()
             return self.translator.translate("Metadata display enabled.")
 
 class OptionBackToRootChannelCommand(Command):
@@ -79,6 +83,7 @@ class BlockCommandCommand(Command):
         if arg[0] == "+":
             if arg[1::] not in self.config.general.blocked_commands:
                 self.config.general.blocked_commands.append(arg[1::])
+                self.command_processor.update_help_index()
                 return self.translator.translate("Added")
             else:
                 return self.translator.translate("This command is already added")
@@ -87,6 +92,7 @@ class BlockCommandCommand(Command):
                 del self.config.general.blocked_commands[
                     self.config.general.blocked_commands.index(arg[1::])
                 ]
+                self.command_processor.update_help_index()
                 return self.translator.translate("Deleted")
             else:
                 return self.translator.translate("This command is not blocked")
@@ -146,38 +152,33 @@ class ClearCacheCommand(Command):
     @property
     def help(self) -> str:
         return self.translator.translate(
-            "r/f/q/p Clears bot's cache. r clears recents, f clears favorites, q clears the queue, p clears saved positions, without an option clears the entire cache"
+            "r/f/q/p/s Clears bot's cache. r clears recents, f clears favorites, q clears the queue, p clears saved positions, s clears search results, without an option clears the entire cache"
         )
 
     def __call__(self, arg: str, user: User) -> Optional[str]:
         if not arg:
-            self.cache.recents.clear()
-            self.cache.favorites.clear()
-            self.cache.queue.clear()
-            self.cache.positions.clear()
+            self.cache.clear()
             self.cache_manager.save()
+            self.service_manager.search_cache.clear()
             return self.translator.translate("Cache cleared")
         elif arg == "r":
-            self.cache.recents.clear()
+            self.cache.clear_recents()
             self.cache_manager.save()
             return self.translator.translate("Recents cleared")
         elif arg == "f":
-            self.cache.favorites.clear()
+            self.cache.clear_favorites()
             self.cache_manager.save()
             return self.translator.translate("Favorites cleared")
         elif arg == "q":
-            self.cache.queue.clear()
+            self.cache.clear_queue()
             self.cache_manager.save()
             return self.translator.translate("Queue cleared")
         elif arg == "p":
-            try:
-                for track in self.cache.recents:
-                    track.resume_position = None
-                    track.resume_duration = None
-                self.cache_manager.save()
-            except Exception:
-                self.cache_manager.save()
+            self.cache_manager.positions.clear()
             return self.translator.translate("Positions cleared")
+        elif arg == "s":
+            self.service_manager.search_cache.clear()
+            return self.translator.translate("Search results cleared")
 
 
 class JoinChannelCommand(Command):
@@ -204,26 +205,17 @@ class JoinChannelCommand(Command):
             cmd = self.ttclient.join_channel(channel, password)
         except ValueError:
             return self.translator.translate("This channel does not exist")
-        while True:
-            try:
-                event = self.ttclient.event_success_queue.get_nowait()
-                if event.source == cmd:
-                    break
-                else:
-                    self.ttclient.event_success_queue.put(event)
-            except Empty:
-                pass
-            try:
-                error = self.ttclient.errors_queue.get_nowait()
-                if error.command_id == cmd:
-                    return self.translator.translate(
-                        "Error joining channel: {error}".format(error=error.message)
-                    )
-                else:
-                    self.ttclient.errors_queue.put(error)
-            except Empty:
-                pass
-            time.sleep(app_vars.loop_timeout)
+        try:
+            self.ttclient.command_tracker.expect(cmd).result(JOIN_CHANNEL_TIMEOUT)
+        except errors.TTEventError as e:
+            return self.translator.translate(
+                "Error joining channel: {error}".format(error=e.args[0].message)
+            )
+        except futures.TimeoutError:
+            self.ttclient.command_tracker.cancel(cmd)
+            return self.translator.translate("Error joining channel: {error}").format(
+                error=self.translator.translate("timed out")
+            )
 
 
 """ class TaskSchedulerCommand(Command):
@@ -361,12 +353,14 @@ class AdminUsersCommand(Command):
         if arg:
             if arg[0] == "+":
                 self.config.teamtalk.users.admins.append(arg[1::])
+                self.ttclient.registry.refresh_access()
                 return self.translator.translate("Added")
             elif arg[0] == "-":
                 try:
                     del self.config.teamtalk.users.admins[
                         self.config.teamtalk.users.admins.index(arg[1::])
                     ]
+                    self.ttclient.registry.refresh_access()
                     return self.translator.translate("Deleted")
                 except ValueError:
                     return self.translator.translate(
@@ -393,12 +387,14 @@ class BannedUsersCommand(Command):
         if arg:
             if arg[0] == "+":
                 self.config.teamtalk.users.banned_users.append(arg[1::])
+                self.ttclient.registry.refresh_access()
                 return self.translator.translate("Added")
             elif arg[0] == "-":
                 try:
                     del self.config.teamtalk.users.banned_users[
                         self.config.teamtalk.users.banned_users.index(arg[1::])
                     ]
+                    self.ttclient.registry.refresh_access()
                     return self.translator.translate("Deleted")
                 except ValueError:
                     return self.translator.translate("This user is not banned")
@@ -436,6 +432,36 @@ class RestartCommand(Command):
             os.execv(sys.executable, args)
 
 
+class StatsCommand(Command):
+    @property
+    def help(self) -> str:
+        return self.translator.translate("Shows bot's internal statistics")
+
+    def __call__(self, arg: str, user: User) -> Optional[str]:
+        translate = self.translator.translate
+        stats = {
+            translate("Commands"): self.command_processor.executor.stats,
+            translate("Rate limit"): self.command_processor.rate_limiter.stats,
+            translate("Cache"): self.cache_manager.stats,
+            translate("Positions"): self.cache_manager.positions.stats,
+            translate("Services"): self.service_manager.stats,
+            translate("Search"): self.service_manager.search_cache.stats,
+            translate("TeamTalk"): self.ttclient.command_tracker.stats,
+            translate("Messages"): self.ttclient.message_scheduler.stats,
+        }
+        if self._bot.pcm_connector:
+            stats[translate("PCM output")] = self._bot.pcm_connector.stats
+        return "\n".join(
+            "{section}: {values}".format(
+                section=section,
+                values=", ".join(
+                    "{}={}".format(name, value) for name, value in values.items()
+                ),
+            )
+            for section, values in stats.items()
+        )
+
+
 class GetChannelIDCommand(Command):
     @property
     def help(self) -> str:
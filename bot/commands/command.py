@@ -4,7 +4,7 @@ import time
 from typing import Any, TYPE_CHECKING, Callable
 
 from bot.commands.task_processor import Task
-from bot.player.enums import TrackType
+from bot.player.enums import State
 
 if TYPE_CHECKING:
     from bot.commands import CommandProcessor
@@ -34,34 +34,9 @@ class Command:
 
     def _report_position(self, user: "User", action: str) -> None:
         try:
-            position = float(self.player._player.time_pos or 0)
-            duration_value = self.player._player.duration
-            duration = float(duration_value) if duration_value else 0
-            track = self.player.track
-            saved = False
-            if track and track.url and track.type != TrackType.Live:
-                if self.config.general.enable_positions:
-                    # set on current track
-                    track.resume_position = position
-                    track.resume_duration = duration
-                    # update matching entry in recents
-                    try:
-                        for i, recent_track in enumerate(reversed(self.cache.recents)):
-                            if recent_track.url == track.url:
-                                recent_track.resume_position = position
-                                recent_track.resume_duration = duration
-                                break
-                    except Exception:
-                        ...
-                    try:
-                        self.cache_manager.save()
-                        saved = True
-                    except Exception as e:
-                        saved = False
-                        fail_msg = f"save error: {e}"
-                else:
-                    saved = False
-            if saved:
+            saved_position = self.player.save_position()
+            if saved_position:
+                position, duration = saved_position
                 msg = self.translator.translate(
                     "Position {action}: {pos:.1f}s of {duration}"
                 ).format(
@@ -70,37 +45,16 @@ class Command:
                     duration=duration,
                 )
             else:
-                extra = f" ({fail_msg})" if "fail_msg" in locals() else ""
                 msg = self.translator.translate(
                     "Position not saved (disabled or unsupported)"
-                ) + extra
+                )
             self.ttclient.send_message(msg, user)
         except Exception:
             pass
 
     def _save_current_position(self) -> None:
         try:
-            if (
-                self.config.general.enable_positions
-                and self.player.state != State.Stopped
-                and self.player.track
-                and self.player.track.url
-                and self.player.track.type != TrackType.Live
-            ):
-                position = float(self.player._player.time_pos or 0)
-                duration_value = self.player._player.duration
-                duration = float(duration_value) if duration_value else 0
-                track = self.player.track
-                track.resume_position = position
-                track.resume_duration = duration
-                try:
-                    for recent_track in reversed(self.cache.recents):
-                        if recent_track.url == track.url:
-                            recent_track.resume_position = position
-                            recent_track.resume_duration = duration
-                            break
-                except Exception:
-                    ...
-                self.cache_manager.save()
+            if self.player.state != State.Stopped:
+                self.player.save_position()
         except Exception:
             pass
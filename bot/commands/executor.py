@@ -0,0 +1,118 @@
+from __future__ import annotations
+from collections import deque
+import logging
+from threading import Condition, Thread
+import time
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+
+job_type = Tuple[float, Callable[..., None], Tuple[Any, ...]]
+
+
+class CommandExecutor:
+    """Runs commands on a fixed number of workers.
+
+    Jobs that share a key (the user who sent the command) run one at a time and in
+    the order they were submitted, jobs of different users run in parallel.
+    """
+
+    def __init__(self, workers: int, backlog: int) -> None:
+        self.backlog = backlog
+        self._condition = Condition()
+        self._jobs: Dict[Hashable, Deque[job_type]] = {}
+        # Chaves com trabalho pendente e nenhum worker ocupado com elas
+        self._ready: Deque[Hashable] = deque()
+        self._pending = 0
+        self._close = False
+        self.max_pending = 0
+        self.started_count = 0
+        self.executed_count = 0
+        self.rejected_count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._workers: List[CommandWorker] = [
+            CommandWorker(self, number) for number in range(max(workers, 1))
+        ]
+
+    def start(self) -> None:
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, key: Hashable, function: Callable[..., None], *args: Any) -> bool:
+        """Queues a job, returns False when the backlog is full."""
+        with self._condition:
+            if self._close or self._pending >= self.backlog:
+                self.rejected_count += 1
+                return False
+            jobs = self._jobs.get(key)
+            if jobs is None:
+                jobs = self._jobs[key] = deque()
+                self._ready.append(key)
+            jobs.append((time.monotonic(), function, args))
+            self._pending += 1
+            self.max_pending = max(self.max_pending, self._pending)
+            self._condition.notify()
+            return True
+
+    def _get_job(self) -> Optional[Tuple[Hashable, job_type]]:
+        with self._condition:
+            while not self._ready and not self._close:
+                self._condition.wait()
+            if self._close:
+                return None
+            key = self._ready.popleft()
+            job = self._jobs[key].popleft()
+            self._pending -= 1
+            self.started_count += 1
+            wait = time.monotonic() - job[0]
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            return key, job
+
+    def _finish_job(self, key: Hashable) -> None:
+        with self._condition:
+            self.executed_count += 1
+            if self._jobs[key]:
+                self._ready.append(key)
+                self._condition.notify()
+            else:
+                del self._jobs[key]
+
+    def close(self) -> None:
+        with self._condition:
+            self._close = True
+            self._condition.notify_all()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "queue_depth": self._pending,
+            "max_queue_depth": self.max_pending,
+            "executed": self.executed_count,
+            "rejected": self.rejected_count,
+            "avg_wait_ms": round(self.total_wait / self.started_count * 1000, 1)
+            if self.started_count
+            else 0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class CommandWorker(Thread):
+    def __init__(self, executor: CommandExecutor, number: int) -> None:
+        super().__init__(daemon=True)
+        self.name = "CommandWorker-{}".format(number)
+        self.executor = executor
+
+    def run(self) -> None:
+        while True:
+            job = self.executor._get_job()
+            if not job:
+                break
+            key, (_, function, args) = job
+            try:
+                function(*args)
+            except Exception:
+                logging.error("", exc_info=True)
+            finally:
+                self.executor._finish_job(key)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Optional, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bot.TeamTalk.structs import User
+    from bot.translator import Translator
+
+
+# Quantos usuários podem ter uma listagem aberta ao mesmo tempo
+MAX_OPEN_LISTINGS = 100
+
+
+class Listing:
+    def __init__(
+        self, items: Sequence[Any], render: Callable[[int, Any], str], footer: str
+    ) -> None:
+        self.items = items
+        self.render = render
+        self.footer = footer
+        self.page = 1
+
+
+class Paginator:
+    """Splits long listings into pages, rendering only the page that is requested.
+
+    Each user has one open listing, and the "pg" command moves through it.
+    """
+
+    def __init__(self, translator: Translator, page_size: int) -> None:
+        self.translator = translator
+        self.page_size = max(page_size, 1)
+        self._listings: OrderedDict[int, Listing] = OrderedDict()
+        self._lock = Lock()
+
+    def show(
+        self,
+        user: User,
+        items: Sequence[Any],
+        render: Callable[[int, Any], str],
+        footer: str = "",
+    ) -> str:
+        """Opens a listing for the user and returns its first page.
+
+        render receives the 1-based number of an item and the item itself.
+        """
+        listing = Listing(items, render, footer)
+        with self._lock:
+            self._listings[user.id] = listing
+            self._listings.move_to_end(user.id)
+            while len(self._listings) > MAX_OPEN_LISTINGS:
+                self._listings.popitem(last=False)
+        return self._render(listing)
+
+    def next(self, user: User) -> str:
+        listing = self._get_listing(user)
+        if not listing:
+            return self.translator.translate("There is no open list")
+        if listing.page >= self._get_page_count(listing):
+            return self.translator.translate("This is the last page")
+        listing.page += 1
+        return self._render(listing)
+
+    def go(self, user: User, page: int) -> str:
+        listing = self._get_listing(user)
+        if not listing:
+            return self.translator.translate("There is no open list")
+        if not 1 <= page <= self._get_page_count(listing):
+            return self.translator.translate("Out of list")
+        listing.page = page
+        return self._render(listing)
+
+    def _get_listing(self, user: User) -> Optional[Listing]:
+        with self._lock:
+            return self._listings.get(user.id)
+
+    def _get_page_count(self, listing: Listing) -> int:
+        return max((len(listing.items) + self.page_size - 1) // self.page_size, 1)
+
+    def _render(self, listing: Listing) -> str:
+        start = (listing.page - 1) * self.page_size
+        lines = [
+            listing.render(number, item)
+            for number, item in enumerate(
+                listing.items[start : start + self.page_size], start + 1
+            )
+        ]
+        page_count = self._get_page_count(listing)
+        if page_count > 1:
+            if listing.page < page_count:
+                lines.append(
+                    self.translator.translate(
+                        'Page {page} of {pages}. Send "pg" for the next page'
+                    ).format(page=listing.page, pages=page_count)
+                )
+            else:
+                lines.append(
+                    self.translator.translate("Page {page} of {pages}").format(
+                        page=listing.page, pages=page_count
+                    )
+                )
+        if listing.footer:
+            lines.append(listing.footer)
+        return "\n".join(lines)
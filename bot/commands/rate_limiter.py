@@ -0,0 +1,136 @@
+from __future__ import annotations
+from threading import Lock
+import time
+from typing import Dict, Hashable, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bot.config.models import RateLimitModel, TokenBucketModel
+
+
+# Acima disso, os baldes cheios (usuários parados) são descartados
+MAX_USER_BUCKETS = 1000
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.last_refill = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def consume(self, now: float) -> float:
+        """Takes a token, returns 0 on success or the seconds until one is available."""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self) -> None:
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    @property
+    def is_full(self) -> bool:
+        return self.tokens >= self.burst
+
+
+class RateLimiter:
+    """Limits expensive commands such as searches and URL extraction.
+
+    Every command in config.command_costs belongs to a cost class, and each class has
+    a bucket per user and a bucket shared by everyone. A command is allowed only when
+    both buckets have a token. A class without a limit (or with a rate of 0) is
+    not limited.
+    """
+
+    def __init__(self, config: RateLimitModel) -> None:
+        self.config = config
+        self._lock = Lock()
+        self._user_buckets: Dict[Tuple[Hashable, str], TokenBucket] = {}
+        self._global_buckets: Dict[str, TokenBucket] = {}
+        self.allowed_count = 0
+        self.user_rejected_count = 0
+        self.global_rejected_count = 0
+
+    def get_cost_class(self, command: str, arg: str) -> Optional[str]:
+        # Sem argumento não há busca nem extração, "p" sozinho só pausa
+        if not self.config.enabled or not arg:
+            return None
+        return self.config.command_costs.get(command)
+
+    def check(
+        self, key: Hashable, command: str, arg: str
+    ) -> Optional[Tuple[float, bool]]:
+        """Takes tokens for a command, returns None if it may run.
+
+        Otherwise returns the seconds to wait and whether the shared budget, rather
+        than the user's own, ran out.
+        """
+        cost_class = self.get_cost_class(command, arg)
+        if not cost_class:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            user_bucket = self._get_user_bucket(key, cost_class)
+            if user_bucket:
+                wait = user_bucket.consume(now)
+                if wait:
+                    self.user_rejected_count += 1
+                    return wait, False
+            global_bucket = self._get_global_bucket(cost_class)
+            if global_bucket:
+                wait = global_bucket.consume(now)
+                if wait:
+                    if user_bucket:
+                        user_bucket.refund()
+                    self.global_rejected_count += 1
+                    return wait, True
+            self.allowed_count += 1
+            return None
+
+    def _get_user_bucket(
+        self, key: Hashable, cost_class: str
+    ) -> Optional[TokenBucket]:
+        bucket = self._user_buckets.get((key, cost_class))
+        if bucket:
+            return bucket
+        limit = self.config.user_limits.get(cost_class)
+        if not limit or limit.rate <= 0:
+            return None
+        if len(self._user_buckets) >= MAX_USER_BUCKETS:
+            self._prune()
+        bucket = self._user_buckets[(key, cost_class)] = self._create_bucket(limit)
+        return bucket
+
+    def _get_global_bucket(self, cost_class: str) -> Optional[TokenBucket]:
+        bucket = self._global_buckets.get(cost_class)
+        if bucket:
+            return bucket
+        limit = self.config.global_limits.get(cost_class)
+        if not limit or limit.rate <= 0:
+            return None
+        bucket = self._global_buckets[cost_class] = self._create_bucket(limit)
+        return bucket
+
+    def _create_bucket(self, limit: TokenBucketModel) -> TokenBucket:
+        return TokenBucket(limit.rate, limit.burst)
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key, bucket in list(self._user_buckets.items()):
+            bucket.refill(now)
+            if bucket.is_full:
+                del self._user_buckets[key]
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "allowed": self.allowed_count,
+            "user_rejected": self.user_rejected_count,
+            "global_rejected": self.global_rejected_count,
+            "tracked_users": len(self._user_buckets),
+        }
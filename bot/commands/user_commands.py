@@ -11,6 +11,12 @@ from bot import errors, app_vars
 
 if TYPE_CHECKING:
     from bot.TeamTalk.structs import User
+    from bot.player.track import Track
+
+
+def render_track(number: int, track: Track) -> str:
+    # display_name nunca dispara a resolução da faixa
+    return "{number}: {track_name}".format(number=number, track_name=track.display_name)
 
 
 class HelpCommand(Command):
@@ -19,7 +25,31 @@ class HelpCommand(Command):
         return self.translator.translate("Shows command help")
 
     def __call__(self, arg: str, user: User) -> Optional[str]:
-        return self.command_processor.help(arg, user)
+        if arg:
+            return self.command_processor.help(arg, user)
+        return self.command_processor.paginator.show(
+            user,
+            self.command_processor.get_help_lines(user),
+            lambda number, line: line,
+            self.command_processor.help_tip,
+        )
+
+
+class PageCommand(Command):
+    @property
+    def help(self) -> str:
+        return self.translator.translate(
+            "NUMBER Shows the next page of the last list. If a number is specified, shows the page with that number"
+        )
+
+    def __call__(self, arg: str, user: User) -> Optional[str]:
+        paginator = self.command_processor.paginator
+        if not arg:
+            return paginator.next(user)
+        try:
+            return paginator.go(user, int(arg))
+        except ValueError:
+            raise errors.InvalidArgumentError()
 
 class TimeCommand(Command):
     @property
@@ -34,8 +64,9 @@ class TimeCommand(Command):
             self.ttclient.send_message(self.translator.translate("Nothing is being played."), user)
             return None
 
-        current = self.player._player.time_pos or 0
-        total = self.player._player.duration or 0
+        snapshot = self.player.snapshot()
+        current = snapshot.position or 0
+        total = snapshot.duration or 0
 
         def format_seconds(seconds):
             h = int(seconds) // 3600
@@ -69,8 +100,9 @@ class TimeRemainingCommand(Command):
             )
             return None
 
-        current = self.player._player.time_pos or 0
-        total = self.player._player.duration or 0
+        snapshot = self.player.snapshot()
+        current = snapshot.position or 0
+        total = snapshot.duration or 0
         remaining = max(total - current, 0) if total > 0 else 0
 
         def format_seconds(seconds):
@@ -122,9 +154,7 @@ class PlayPauseCommand(Command):
                     user,
                 )
                 try:
-                    track_list = self.service_manager.service.search(arg)
-                    if not track_list:
-                        raise errors.NothingFoundError()
+                    track_list = self.service_manager.search(arg)
                     track = track_list[0].get_raw()
                     self.cache.add_to_queue(track)
                     self.cache_manager.save()
@@ -139,8 +169,9 @@ class PlayPauseCommand(Command):
                     if self.player.state == State.Stopped:
                         self.player.play_queue()
                         return self.translator.translate("Playing {}").format(
-                            track.name if track.name else track.url
+                            track.display_name
                         )
+                    self.player.prefetch()
                     return self.translator.translate("Added to queue")
                 except errors.NothingFoundError:
                     return self.translator.translate("Nothing is found for your query")
@@ -154,7 +185,7 @@ class PlayPauseCommand(Command):
                 user,
             )
             try:
-                track_list = self.service_manager.service.search(arg)
+                track_list = self.service_manager.search(arg)
                 if self.config.general.send_channel_messages:
                     self.run_async(
                         self.ttclient.send_message,
@@ -165,7 +196,7 @@ class PlayPauseCommand(Command):
                     )
                 self.run_async(self.player.play, track_list)
                 return self.translator.translate("Playing {}").format(
-                    track_list[0].name
+                    track_list[0].display_name
                 )
             except errors.NothingFoundError:
                 return self.translator.translate("Nothing is found for your query")
@@ -206,8 +237,9 @@ class PlayUrlCommand(Command):
                     if self.player.state == State.Stopped:
                         self.player.play_queue()
                         return self.translator.translate("Playing {}").format(
-                            tracks[0].name if tracks[0].name else tracks[0].url
+                            tracks[0].display_name
                         )
+                    self.player.prefetch()
                     return self.translator.translate("Added to queue")
                 if self.config.general.send_channel_messages:
                     self.run_async(
@@ -401,6 +433,8 @@ class ModeCommand(Command):
                     and self.cache.queue
                 ):
                     self.player.play_queue()
+                else:
+                    self.player.prefetch()
                 return self.translator.translate("Current mode: {mode}").format(
                     mode=self.mode_names[self.player.mode]
                 )
@@ -615,10 +649,7 @@ class FavoritesCommand(Command):
 
     def _add(self, user: User) -> str:
         if self.player.state != State.Stopped:
-            if user.username in self.cache.favorites:
-                self.cache.favorites[user.username].append(self.player.track.get_raw())
-            else:
-                self.cache.favorites[user.username] = [self.player.track.get_raw()]
+            self.cache.add_to_favorites(user.username, self.player.track.get_raw())
             self.cache_manager.save()
             return self.translator.translate("Added")
         else:
@@ -628,9 +659,14 @@ class FavoritesCommand(Command):
         if (self.player.state != State.Stopped and len(arg) == 1) or len(arg) > 1:
             try:
                 if len(arg) == 1:
-                    self.cache.favorites[user.username].remove(self.player.track)
+                    self.cache.remove_from_favorites(
+                        user.username,
+                        self.cache.favorites[user.username].index(self.player.track),
+                    )
                 else:
-                    del self.cache.favorites[user.username][int(arg[1::]) - 1]
+                    self.cache.remove_from_favorites(
+                        user.username, int(arg[1::]) - 1
+                    )
                 self.cache_manager.save()
                 return self.translator.translate("Deleted")
             except IndexError:
@@ -643,21 +679,12 @@ class FavoritesCommand(Command):
             return self.translator.translate("Nothing is playing")
 
     def _list(self, user: User) -> str:
-        track_names: List[str] = []
-        try:
-            for number, track in enumerate(self.cache.favorites[user.username]):
-                track_names.append(
-                    "{number}: {track_name}".format(
-                        number=number + 1,
-                        track_name=track.name if track.name else track.url,
-                    )
-                )
-        except KeyError:
-            pass
-        if len(track_names) > 0:
-            return "\n".join(track_names)
-        else:
+        favorites = self.cache.favorites.get(user.username)
+        if not favorites:
             return self.translator.translate("The list is empty")
+        return self.command_processor.paginator.show(
+            user, list(favorites), render_track
+        )
 
     def _play(self, arg: str, user: User) -> Optional[str]:
         try:
@@ -682,9 +709,10 @@ class QueueCommand(Command):
     def __call__(self, arg: str, user: User) -> Optional[str]:
         if arg:
             if arg == "c":
-                self.cache.queue.clear()
+                self.cache.clear_queue()
                 self.cache_manager.save()
                 self.player._queue_active_track = False
+                self.player.prefetch()
                 return self.translator.translate("Queue cleared")
             if arg[0] == "+":
                 return self._add_current()
@@ -693,7 +721,7 @@ class QueueCommand(Command):
             else:
                 raise errors.InvalidArgumentError
         else:
-            return self._list()
+            return self._list(user)
 
     def _auto_start_queue(self) -> None:
         if self.player.mode == Mode.Queue and self.player.state == State.Stopped:
@@ -705,9 +733,10 @@ class QueueCommand(Command):
     def _add_current(self) -> str:
         if self.player.state == State.Stopped:
             return self.translator.translate("Nothing is playing")
-        self.cache.queue.append(self.player.track.get_raw())
+        self.cache.add_to_queue(self.player.track.get_raw())
         self.cache_manager.save()
         self._auto_start_queue()
+        self.player.prefetch()
         return self.translator.translate("Added to queue")
 
     def _remove(self, arg: str) -> str:
@@ -723,31 +752,26 @@ class QueueCommand(Command):
                     except errors.NoNextTrackError:
                         self.player.stop()
                 else:
-                    del self.cache.queue[0]
+                    self.cache.remove_from_queue(0)
                     self.cache_manager.save()
                 return self.translator.translate("Deleted")
             else:
                 return self.translator.translate("The list is empty")
         try:
             index = int(arg[1::]) - 1
-            del self.cache.queue[index]
+            self.cache.remove_from_queue(index)
             self.cache_manager.save()
+            self.player.prefetch()
             return self.translator.translate("Deleted")
         except (ValueError, IndexError):
             return self.translator.translate("Out of list")
 
-    def _list(self) -> str:
-        track_names: List[str] = []
-        for number, track in enumerate(self.cache.queue):
-            track_names.append(
-                "{number}: {track_name}".format(
-                    number=number + 1, track_name=track.name if track.name else track.url
-                )
-            )
-        if len(track_names) > 0:
-            return "\n".join(track_names)
-        else:
+    def _list(self, user: User) -> str:
+        if not self.cache.queue:
             return self.translator.translate("The list is empty")
+        return self.command_processor.paginator.show(
+            user, list(self.cache.queue), render_track
+        )
 
 
 class GetLinkCommand(Command):
@@ -812,38 +836,28 @@ class RecentsCommand(Command):
                     and 0 <= start_index < len(recents_list)
                 ):
                     track = recents_list[start_index]
-                    if (
-                        track.resume_position
-                        and track.type not in (TrackType.Live,)
-                        and track.resume_position > 0
-                        and (
-                            not track.resume_duration
-                            or track.resume_position < track.resume_duration
-                        )
-                    ):
-                        seek_pos = track.resume_position
-                        self.run_async(self._seek_with_delay, seek_pos)
+                    saved_position = self.cache_manager.positions.get(
+                        track.position_key
+                    )
+                    if saved_position and track.type != TrackType.Live:
+                        position, duration = saved_position
+                        if position > 0 and (not duration or position < duration):
+                            self.run_async(self._seek_with_delay, position)
             except ValueError:
                 raise errors.InvalidArgumentError()
             except IndexError:
                 return self.translator.translate("Out of list")
         else:
-            track_names: List[str] = []
-            for number, track in enumerate(reversed(self.cache.recents)):
-                if track.name:
-                    track_names.append(f"{number + 1}: {track.name}")
-                else:
-                    track_names.append(f"{number + 1}: {track.url}")
-            return (
-                "\n".join(track_names)
-                if track_names
-                else self.translator.translate("The list is empty")
+            if not self.cache.recents:
+                return self.translator.translate("The list is empty")
+            return self.command_processor.paginator.show(
+                user, list(reversed(self.cache.recents)), render_track
             )
 
     def _seek_with_delay(self, position: float) -> None:
         # Ensure playback actually starts before seeking
         for _ in range(10):
-            if self.player.state == State.Playing and self.player._player.time_pos is not None:
+            if self.player.state == State.Playing and self.player.snapshot().position is not None:
                 break
             time.sleep(0.2)
         try:
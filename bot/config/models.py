@@ -3,6 +3,24 @@ from typing import Any, Dict, List, Union
 from pydantic import BaseModel
 
 
+class TokenBucketModel(BaseModel):
+    rate: float
+    burst: int
+
+
+class RateLimitModel(BaseModel):
+    enabled: bool = True
+    command_costs: Dict[str, str] = {"p": "search", "u": "resolve"}
+    user_limits: Dict[str, TokenBucketModel] = {
+        "search": TokenBucketModel(rate=0.2, burst=3),
+        "resolve": TokenBucketModel(rate=0.2, burst=3),
+    }
+    global_limits: Dict[str, TokenBucketModel] = {
+        "search": TokenBucketModel(rate=1, burst=10),
+        "resolve": TokenBucketModel(rate=1, burst=10),
+    }
+
+
 class GeneralModel(BaseModel):
     language: str = "en"
     send_channel_messages: bool = True
@@ -10,16 +28,28 @@ class GeneralModel(BaseModel):
     root_channel_id: int = 1
     showmeta: bool = True
     enable_positions: bool = False
+    # Segundos entre os salvamentos da posição durante a reprodução; 0 desliga
+    position_checkpoint_interval: int = 30
 
     cache_file_name: str = "TTMediaBotCache.dat"
+    cache_write_interval: int = 500
+    command_workers: int = 4
+    command_backlog: int = 100
+    list_page_size: int = 20
     blocked_commands: List[str] = []
+    rate_limit: RateLimitModel = RateLimitModel()
     delete_uploaded_files_after: int = 300
     time_format: str = r"%H:%M"
     start_commands: List[str] = []
 
 class SoundDevicesModel(BaseModel):
+    # "device" toca num dispositivo de saída, "pcm" manda o áudio direto ao TeamTalk
+    mode: str = "device"
     output_device: int = 0
     input_device: int = 0
+    pcm_sample_rate: int = 48000
+    pcm_channels: int = 2
+    pcm_block_duration: int = 20
 
 
 class PlayerModel(BaseModel):
@@ -27,7 +57,11 @@ class PlayerModel(BaseModel):
     max_volume: int = 100
     volume_fading: bool = True
     volume_fading_interval: float = 0.025
+    # linear, ease_in, ease_out, ease_in_out ou exponential
+    volume_fading_curve: str = "linear"
     seek_step: int = 5
+    prefetch_tracks: int = 2
+    gapless: bool = True
     player_options: Dict[str, Any] = {}
     bass_boost_level: int = 0
 
@@ -57,6 +91,8 @@ class TeamTalkModel(BaseModel):
     license_key: str = ""
     reconnection_attempts: int = -1
     reconnection_timeout: int = 10
+    message_rate: float = 5.0
+    message_burst: int = 10
     users: TeamTalkUserModel = TeamTalkUserModel()
     event_handling: EventHandlingModel = EventHandlingModel()
 
@@ -69,6 +105,10 @@ class VkModel(BaseModel):
 class YtModel(BaseModel):
     enabled: bool = True
     cookiefile_path: str = ""
+    # 0 extrai dentro do processo do bot
+    extraction_workers: int = 2
+    extraction_worker_max_jobs: int = 50
+    extraction_timeout: float = 15.0
 
 
 class YamModel(BaseModel):
@@ -80,12 +120,38 @@ class DropboxModel(BaseModel):
     enabled: bool = True
 
 
+class FederatedModel(BaseModel):
+    enabled: bool = True
+    services: List[str] = ["yt", "vk", "yam"]
+    deadline: float = 8.0
+    deadlines: Dict[str, float] = {}
+    min_results: int = 30
+    min_services: int = 2
+
+
+class CircuitBreakerModel(BaseModel):
+    failure_threshold: int = 3
+    reset_timeout: float = 30.0
+    call_timeout: float = 20.0
+    call_timeouts: Dict[str, float] = {}
+    # Threads de chamada por serviço; um serviço travado só ocupa as suas
+    call_workers: int = 4
+
+
 class ServicesModel(BaseModel):
     default_service: str = "vk"
     vk: VkModel = VkModel()
     yam: YamModel = YamModel()
     yt: YtModel = YtModel()
     dropbox: DropboxModel = DropboxModel()
+    federated: FederatedModel = FederatedModel()
+    circuit_breaker: CircuitBreakerModel = CircuitBreakerModel()
+    stream_cache_ttl: int = 1800
+    stream_cache_refresh_margin: int = 300
+    search_cache_size: int = 200
+    search_cache_ttl: int = 900
+    search_cache_negative_ttl: int = 60
+    search_cache_file_name: str = ""
 
 
 class LoggerModel(BaseModel):
@@ -1 +1,2 @@
+from .pcm_connector import PcmConnector
 from .tt_player_connector import TTPlayerConnector
@@ -0,0 +1,99 @@
+from __future__ import annotations
+import logging
+import os
+import select
+from threading import Thread
+import time
+from typing import Dict, TYPE_CHECKING
+
+from bot.player.pcm_output import SAMPLE_WIDTH, remove_fifo
+
+if TYPE_CHECKING:
+    from bot import Bot
+
+
+IDLE_TIMEOUT = 0.2
+
+
+class PcmConnector(Thread):
+    """Feeds the PCM mpv writes to the FIFO straight into TeamTalk's voice stream.
+
+    mpv's pcm output isn't paced, it writes as fast as the FIFO is read, so blocks
+    are read and inserted at real-time speed. The FIFO stays open for reading and
+    writing, so it never loses its last writer: mpv can close and reopen it between
+    files without the audio written in between being dropped. When mpv stops
+    writing, the partial block waiting in the buffer is sent after one block duration.
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        super().__init__(daemon=True)
+        self.name = "PcmConnector"
+        self.config = bot.config.sound_devices
+        self.ttclient = bot.ttclient
+        self.path = bot.player.pcm_fifo_path
+        self.sample_rate = self.config.pcm_sample_rate
+        self.channels = self.config.pcm_channels
+        self.block_duration = self.config.pcm_block_duration / 1000
+        self.frame_size = SAMPLE_WIDTH * self.channels
+        self.block_size = (
+            int(self.sample_rate * self.block_duration) * self.frame_size
+        )
+        self._close = False
+        self._next_time = 0.0
+        self.inserted_count = 0
+        self.failed_count = 0
+
+    def run(self) -> None:
+        try:
+            fd = os.open(self.path, os.O_RDWR)
+        except OSError:
+            logging.error("Failed to open the audio FIFO", exc_info=True)
+            return
+        try:
+            self._pump(fd)
+        except OSError:
+            logging.error("Failed to read audio from mpv", exc_info=True)
+        finally:
+            os.close(fd)
+
+    def _pump(self, fd: int) -> None:
+        buffer = b""
+        while not self._close:
+            timeout = self.block_duration if buffer else IDLE_TIMEOUT
+            readable, _, _ = select.select([fd], [], [], timeout)
+            if readable:
+                buffer += os.read(fd, self.block_size - len(buffer))
+                if len(buffer) < self.block_size:
+                    continue
+            # Bloco cheio, ou o mpv parou de escrever: vai o que houver em quadros inteiros.
+            # O resto de um quadro incompleto fica para o próximo bloco
+            size = len(buffer) - len(buffer) % self.frame_size
+            if not size:
+                continue
+            self._insert(buffer[:size])
+            buffer = buffer[size:]
+
+    def _insert(self, data: bytes) -> None:
+        now = time.monotonic()
+        if now - self._next_time > self.block_duration:
+            # Depois de uma pausa o relógio recomeça, em vez de correr atrás
+            self._next_time = now
+        elif self._next_time > now:
+            time.sleep(self._next_time - now)
+        if self.ttclient.insert_audio_block(data, self.sample_rate, self.channels):
+            self.inserted_count += 1
+        else:
+            self.failed_count += 1
+        self._next_time += len(data) / self.frame_size / self.sample_rate
+
+    def close(self) -> None:
+        # A thread percebe em até IDLE_TIMEOUT segundos e fecha o FIFO
+        self._close = True
+        remove_fifo(self.path)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "inserted_blocks": self.inserted_count,
+            "failed_blocks": self.failed_count,
+        }
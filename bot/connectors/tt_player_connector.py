@@ -1,11 +1,10 @@
 from __future__ import annotations
 import logging
+from queue import Empty, Queue
 from threading import Thread
-import time
-from typing import TYPE_CHECKING
+from typing import Any, TYPE_CHECKING
 
 from bot.player import State
-from bot import app_vars
 
 if TYPE_CHECKING:
     from bot import Bot
@@ -20,6 +19,31 @@ class TTPlayerConnector(Thread):
         self.translator = bot.translator
         self.config = bot.config
         self.config_manager = bot.config_manager
+        # No modo PCM a voz vem dos blocos inseridos, não do dispositivo de entrada
+        self.pcm_mode = self.config.sound_devices.mode == "pcm"
+        self._updates: Queue[bool] = Queue()
+        self.player.add_state_listener(self._on_player_update)
+        self.player.add_metadata_listener(self._on_player_update)
+        # Publica o estado inicial assim que a thread começar
+        self.update()
+
+    def _on_player_update(self, _: Any) -> None:
+        self.update()
+
+    def update(self) -> None:
+        """Asks the connector to compare the player with the status it last published."""
+        self._updates.put(True)
+
+    def _wait_update(self) -> bool:
+        if not self._updates.get():
+            return False
+        # Várias notificações seguidas valem por uma só atualização
+        try:
+            while True:
+                if not self._updates.get_nowait():
+                    return False
+        except Empty:
+            return True
 
     def run(self):
         last_player_state = State.Stopped
@@ -27,14 +51,15 @@ class TTPlayerConnector(Thread):
 
         last_track_meta = {"name": None, "url": None}
         self._close = False
-        while not self._close:
+        while not self._close and self._wait_update():
             try:
                 if self.player.state != last_player_state or last_showmeta != self.config.general.showmeta:
                     last_player_state = self.player.state
                     last_showmeta = self.config.general.showmeta
 
                     if self.player.state == State.Playing:
-                        self.ttclient.enable_voice_transmission()
+                        if not self.pcm_mode:
+                            self.ttclient.enable_voice_transmission()
                         last_track_meta = self.player.track.get_meta()
                         if self.config.general.showmeta:
                             if self.player.track.name:
@@ -89,7 +114,7 @@ class TTPlayerConnector(Thread):
                         )
             except Exception:
                 logging.error("", exc_info=True)
-            time.sleep(app_vars.loop_timeout)
 
     def close(self):
         self._close = True
+        self._updates.put(False)
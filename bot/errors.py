@@ -26,6 +26,14 @@ class ServiceError(Exception):
     pass
 
 
+class ServiceUnavailableError(ServiceError):
+    pass
+
+
+class ServiceTransportError(ServiceError):
+    pass
+
+
 class NothingFoundError(Exception):
     pass
 
@@ -33,6 +33,17 @@ def to_v4(cache_data: cache_data_type) -> cache_data_type:
 migrate_functs[4] = to_v4
 
 
+def to_v5(cache_data: cache_data_type) -> cache_data_type:
+    tracks = list(cache_data.get("recents", [])) + list(cache_data.get("queue", []))
+    for favorites in cache_data.get("favorites", {}).values():
+        tracks += favorites
+    for track in tracks:
+        track.compact()
+    return update_version(cache_data, 5)
+
+migrate_functs[5] = to_v5
+
+
 def migrate(
     cache_manager: CacheManager,
     cache_data: cache_data_type,
@@ -57,4 +68,5 @@ def migrate(
 def update_version(cache_data: cache_data_type, version: int) -> cache_data_type:
     _cache_data = {"cache_version": version}
     _cache_data.update(cache_data)
+    _cache_data["cache_version"] = version
     return _cache_data
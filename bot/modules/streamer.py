@@ -28,7 +28,7 @@ class Streamer:
                         parsed_url.hostname in service.hostnames
                         or service.name == self.service_manager.fallback_service
                     ):
-                        fetched_data = service.get(url)
+                        fetched_data = self.service_manager.get(service, url)
                         break
                 except errors.ServiceError:
                     continue
@@ -37,7 +37,7 @@ class Streamer:
                         return [
                             track,
                         ]
-            if len(fetched_data) == 1 and fetched_data[0].url.startswith(
+            if len(fetched_data) == 1 and fetched_data[0].resolve().result().url.startswith(
                 str(track.url)
             ):
                 return [
@@ -1,21 +1,26 @@
 from __future__ import annotations
+from concurrent import futures
+import logging
 import threading
 import time
 import os
 import tempfile
 from typing import TYPE_CHECKING
-from queue import Empty
 
 
 from bot.player.track import Track
 from bot.player.enums import TrackType
 from bot.TeamTalk.structs import ErrorType, User
-from bot import app_vars
+from bot import errors
 
 if TYPE_CHECKING:
     from bot import Bot
 
 
+# Tempo máximo para o arquivo aparecer no canal depois do envio
+UPLOAD_TIMEOUT = 600
+
+
 class Uploader:
     def __init__(self, bot: Bot):
         self.config = bot.config
@@ -34,46 +39,59 @@ class Uploader:
         thread.start()
 
     def run(self, track: Track, user: User) -> None:
-        error_exit = False
         if track.type == TrackType.Default:
             temp_dir = tempfile.TemporaryDirectory()
             file_path = track.download(temp_dir.name)
         else:
             file_path = track.url
-        command_id = self.ttclient.send_file(self.ttclient.channel.id, file_path)
+        command_tracker = self.ttclient.command_tracker
         file_name = os.path.basename(file_path)
-        while True:
-            try:
-                file = self.ttclient.uploaded_files_queue.get_nowait()
-                if file.name == file_name:
-                    break
-                else:
-                    self.ttclient.uploaded_files_queue.put(file)
-            except Empty:
-                pass
-            try:
-                error = self.ttclient.errors_queue.get_nowait()
-                if (
-                    error.command_id == command_id
-                    and error.type == ErrorType.MaxDiskusageExceeded
-                ):
-                    self.ttclient.send_message(
-                        self.translator.translate("Error: {}").format(
-                            "Max diskusage exceeded"
-                        ),
-                        user,
-                    )
-                    error_exit = True
-                else:
-                    self.ttclient.errors_queue.put(error)
-            except Empty:
-                pass
-            time.sleep(app_vars.loop_timeout)
-        time.sleep(app_vars.loop_timeout)
-        if track.type == TrackType.Default:
-            temp_dir.cleanup()
-        if error_exit:
+        file_future = command_tracker.expect_file(file_name)
+        command_id = self.ttclient.send_file(self.ttclient.channel.id, file_path)
+        command_future = command_tracker.expect(command_id)
+        try:
+            futures.wait(
+                (command_future, file_future),
+                UPLOAD_TIMEOUT,
+                return_when=futures.FIRST_EXCEPTION,
+            )
+            if command_future.done():
+                command_future.result()
+            file = file_future.result(0)
+        except errors.TTEventError as e:
+            error = e.args[0]
+            if error.type == ErrorType.MaxDiskusageExceeded:
+                message = "Max diskusage exceeded"
+            else:
+                message = error.message
+            self.ttclient.send_message(
+                self.translator.translate("Error: {}").format(message),
+                user,
+            )
+            return
+        except futures.TimeoutError:
+            logging.warning(
+                "Upload of {} didn't finish within {} seconds".format(
+                    file_name, UPLOAD_TIMEOUT
+                )
+            )
+            # Um resultado que chegue depois é descartado pelo command_tracker
+            command_tracker.cancel(command_id)
+            self.ttclient.send_message(
+                self.translator.translate("Error: {}").format(
+                    self.translator.translate("timed out")
+                ),
+                user,
+            )
+            return
+        except errors.ConnectionError:
+            logging.warning("Upload of {} didn't finish".format(file_name))
             return
+        finally:
+            command_tracker.cancel(command_id)
+            command_tracker.cancel_file(file_name)
+            if track.type == TrackType.Default:
+                temp_dir.cleanup()
         if self.config.general.delete_uploaded_files_after > 0:
             timeout = self.config.general.delete_uploaded_files_after
         else:
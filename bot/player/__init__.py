@@ -1,15 +1,22 @@
 from __future__ import annotations
 import html
 import logging
-import time
-from typing import Any, Dict, Callable, List, Optional, TYPE_CHECKING
+import re
+import sys
+from threading import Lock
+from typing import Any, Dict, Callable, List, Optional, Tuple, TYPE_CHECKING
 import random
 
 import mpv
 
 from bot import errors
+from bot.player import pcm_output
+from bot.player.clock import PlaybackClock, PlaybackSnapshot
 from bot.player.enums import Mode, State, TrackType
+from bot.player.position_checkpointer import PositionCheckpointer
+from bot.player.prefetcher import TrackPrefetcher
 from bot.player.track import Track
+from bot.player.volume_fader import VolumeFader
 from bot.sound_devices import SoundDevice, SoundDeviceType
 
 
@@ -19,6 +26,8 @@ if TYPE_CHECKING:
 
 MAX_TRACK_LIST_SIZE = 1000
 
+re_expired_stream = re.compile(r"HTTP error (403|410)")
+
 
 class Player:
     def __init__(self, bot: Bot):
@@ -26,6 +35,7 @@ class Player:
         self.general_config = bot.config.general
         self.cache = bot.cache
         self.cache_manager = bot.cache_manager
+        self.positions = bot.cache_manager.positions
         mpv_options = {
             "demuxer_lavf_o": "http_persistent=false",
             "demuxer_max_back_bytes": 1048576,
@@ -34,6 +44,21 @@ class Player:
             "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/111.0.0.0 Safari/537.36",
             "ytdl": False,
         }
+        if self.config.gapless:
+            # O mpv abre e bufferiza a próxima faixa da playlist antes da atual acabar
+            mpv_options["prefetch_playlist"] = True
+        self.pcm_fifo_path: Optional[str] = None
+        if bot.config.sound_devices.mode == "pcm":
+            try:
+                self.pcm_fifo_path = pcm_output.create_fifo()
+            except OSError as e:
+                logging.error(e)
+                sys.exit(
+                    bot.translator.translate("PCM mode is unavailable: {}").format(e)
+                )
+            mpv_options.update(
+                pcm_output.get_mpv_options(bot.config.sound_devices, self.pcm_fifo_path)
+            )
         mpv_options.update(self.config.player_options)
         try:
             self._player = mpv.MPV(**mpv_options, log_handler=self.log_handler)
@@ -41,16 +66,46 @@ class Player:
             del mpv_options["demuxer_max_back_bytes"]
             self._player = mpv.MPV(**mpv_options, log_handler=self.log_handler)
         self._log_level = 5
+        self._state_listeners: List[Callable[[State], None]] = []
+        self._metadata_listeners: List[Callable[[Track], None]] = []
         self.track_list: List[Track] = []
-        self.track: Track = Track()
+        self._track: Track = Track()
         self.track_index: int = -1
-        self.state = State.Stopped
+        self._state = State.Stopped
         self.mode = Mode.TrackList
         self.volume = self.config.default_volume
         self._queue_active_track = False
         self.bass_boost_level = 0
         self._position_saved_for_track: Optional[str] = None
+        # Faixa cujo arquivo o mpv está tocando; None depois que ela chega ao fim
+        self._playing_track: Optional[Track] = None
+        self._position_lock = Lock()
         self._suppress_position_clear = False
+        self._stream_expired = False
+        self._expired_stream_track: Optional[Track] = None
+        # Motivo do último end-file, para saber se a faixa anterior tocou até o fim
+        self._end_file_reason: Optional[int] = None
+        self.prefetcher = TrackPrefetcher()
+        self.clock = PlaybackClock()
+        self.position_checkpointer: Optional[PositionCheckpointer] = None
+        if (
+            self.general_config.enable_positions
+            and self.general_config.position_checkpoint_interval > 0
+        ):
+            self.position_checkpointer = PositionCheckpointer(
+                self._checkpoint_position,
+                self.general_config.position_checkpoint_interval,
+            )
+        self.volume_fader = VolumeFader(
+            lambda: self._player.volume,
+            self._set_player_volume,
+            self.config.volume_fading_interval,
+            self.config.volume_fading_curve,
+        )
+        # Próxima faixa esperada e a que já foi anexada à playlist do mpv
+        self._next_entry: Optional[Tuple[Track, int]] = None
+        self._appended_entry: Optional[Tuple[Track, int]] = None
+        self._next_entry_lock = Lock()
         try:
             self.set_bass_boost(self.config.bass_boost_level)
         except Exception:
@@ -62,18 +117,65 @@ class Player:
 
     def run(self) -> None:
         logging.debug("Registering player callbacks")
+        self.clock.observe(self._player)
+        self.register_event_callback("start-file", self.clock.on_start_file)
         self.register_event_callback("end-file", self.on_end_file)
         self._player.observe_property("metadata", self.on_metadata_update)
         self._player.observe_property("media-title", self.on_metadata_update)
+        if self.config.gapless:
+            self._player.observe_property("playlist-pos", self.on_playlist_pos)
         logging.debug("Player callbacks registered")
+        self.prefetcher.start()
+        self.volume_fader.start()
+        if self.position_checkpointer:
+            self.position_checkpointer.start()
 
     def close(self) -> None:
         logging.debug("Closing player")
         if self.state != State.Stopped:
             self.stop()
+        self.prefetcher.close()
+        self.volume_fader.close()
+        if self.position_checkpointer:
+            self.position_checkpointer.close()
         self._player.terminate()
         logging.debug("Player closed")
 
+    @property
+    def state(self) -> State:
+        return self._state
+
+    @state.setter
+    def state(self, state: State) -> None:
+        if state == self._state:
+            return
+        self._state = state
+        for listener in self._state_listeners:
+            listener(state)
+
+    @property
+    def track(self) -> Track:
+        return self._track
+
+    @track.setter
+    def track(self, track: Track) -> None:
+        if track is self._track:
+            return
+        self._track = track
+        self._notify_metadata()
+
+    def add_state_listener(self, listener: Callable[[State], None]) -> None:
+        """Calls listener with the new state whenever the playback state changes."""
+        self._state_listeners.append(listener)
+
+    def add_metadata_listener(self, listener: Callable[[Track], None]) -> None:
+        """Calls listener whenever the current track or its name or link changes."""
+        self._metadata_listeners.append(listener)
+
+    def _notify_metadata(self) -> None:
+        for listener in self._metadata_listeners:
+            listener(self._track)
+
     def play(
         self,
         tracks: Optional[List[Track]] = None,
@@ -86,7 +188,7 @@ class Player:
             and self.track.url
             and self.track.type != TrackType.Live
         ):
-            self._save_position_marker()
+            self.save_position()
         self._queue_active_track = False
         if tracks != None:
             # Limitar track_list para evitar consumo excessivo de RAM
@@ -101,40 +203,213 @@ class Player:
             else:
                 self.track_index = start_track_index if start_track_index else 0
                 self.track = tracks[self.track_index]
-            self._play(self.track.url)
+            self._play(self._get_stream_url(self.track))
         else:
             self._player.pause = False
-        self._player.volume = self.volume
+        self.volume_fader.set_volume(self.volume)
         self.state = State.Playing
 
     def pause(self) -> None:
         self.state = State.Paused
         self._player.pause = True
-        self._save_position_marker()
+        self.save_position()
 
     def stop(self) -> None:
-        self._save_position_marker()
+        self.save_position()
+        with self._position_lock:
+            self._playing_track = None
         self.state = State.Stopped
         self._suppress_position_clear = True
+        self._forget_next_entry()
         self._player.stop()
         self.track_list = []
         self.track = Track()
         self.track_index = -1
         self._queue_active_track = False
 
+    def _get_stream_url(self, track: Track) -> str:
+        # Só quem vai tocar a faixa espera pela resolução
+        return track.resolve().result().url
+
     def _play(self, arg: str, save_to_recents: bool = True) -> None:
         if save_to_recents:
-            try:
-                if self.cache.recents[-1] != self.track_list[self.track_index]:
-                    self.cache.recents.append(
-                        self.track_list[self.track_index].get_raw()
-                    )
-            except:
-                self.cache.recents.append(self.track_list[self.track_index].get_raw())
-            self.cache_manager.save()
+            self._add_to_recents()
         self._position_saved_for_track = None
+        self._stream_expired = False
         self._player.pause = False
+        # Substituir o arquivo limpa a playlist do mpv, inclusive a faixa anexada
+        self._forget_next_entry()
+        with self._position_lock:
+            # Até o mpv começar o arquivo novo, o relógio ainda mostra o anterior
+            self.clock.expect_file()
+            self._playing_track = self.track
         self._player.play(arg)
+        # A faixa pode ter acabado de ser resolvida, com nome e link novos
+        self._notify_metadata()
+        self.prefetch()
+
+    def _add_to_recents(self) -> None:
+        try:
+            if self.cache.recents[-1] != self.track_list[self.track_index]:
+                self.cache.add_to_recents(
+                    self.track_list[self.track_index].get_raw()
+                )
+        except:
+            self.cache.add_to_recents(self.track_list[self.track_index].get_raw())
+        self.cache_manager.save()
+
+    def prefetch(self) -> None:
+        """Resolves upcoming tracks and appends the next one to mpv's playlist.
+
+        Call it whenever the mode, the track list or the queue changes.
+        """
+        if self.config.prefetch_tracks > 0:
+            self.prefetcher.schedule(
+                self._get_upcoming_tracks(self.config.prefetch_tracks)
+            )
+        if self.config.gapless:
+            self._update_next_entry()
+
+    def _get_next_entry(self) -> Optional[Tuple[Track, int]]:
+        """Returns the track that follows the current one and its index, if known.
+
+        Queue tracks get the index -1, as the track list is rebuilt from the queue.
+        """
+        if not self.track:
+            return None
+        if self.mode == Mode.Queue:
+            start = 1 if self._queue_active_track else 0
+            if len(self.cache.queue) > start:
+                return self.cache.queue[start], -1
+            return None
+        if (
+            self.mode == Mode.SingleTrack
+            or self.track.type == TrackType.Direct
+            or not self.track_list
+        ):
+            return None
+        if self.mode == Mode.RepeatTrack:
+            return self.track, self.track_index
+        if self.mode == Mode.Random:
+            try:
+                position = self._index_list.index(self.track_index)
+                index = self._index_list[position + 1]
+            except (AttributeError, ValueError, IndexError):
+                return None
+        else:
+            index = self.track_index + 1
+            if self.mode == Mode.RepeatTrackList:
+                index %= len(self.track_list)
+        if not 0 <= index < len(self.track_list):
+            return None
+        return self.track_list[index], index
+
+    def _update_next_entry(self) -> None:
+        next_entry = self._get_next_entry()
+        with self._next_entry_lock:
+            if self._is_same_entry(next_entry, self._next_entry):
+                return
+            self._next_entry = next_entry
+            if self._appended_entry:
+                # A faixa anexada não é mais a próxima
+                self._appended_entry = None
+                try:
+                    self._player.command("playlist-remove", 1)
+                except Exception:
+                    pass
+        if not next_entry:
+            return
+        track = next_entry[0]
+        if track.is_resolved:
+            self._append_next_entry(next_entry)
+        else:
+            track.resolve().add_done_callback(
+                lambda future: self._append_next_entry(next_entry)
+                if not future.exception()
+                else None
+            )
+
+    def _is_same_entry(
+        self,
+        entry: Optional[Tuple[Track, int]],
+        other_entry: Optional[Tuple[Track, int]],
+    ) -> bool:
+        if not entry or not other_entry:
+            return entry is other_entry
+        return entry[0] is other_entry[0] and entry[1] == other_entry[1]
+
+    def _append_next_entry(self, entry: Tuple[Track, int]) -> None:
+        with self._next_entry_lock:
+            if not self._is_same_entry(entry, self._next_entry) or self._appended_entry:
+                return
+            try:
+                self._player.command("loadfile", entry[0].url, "append")
+            except Exception:
+                logging.warning("Failed to append the next track", exc_info=True)
+                return
+            self._appended_entry = entry
+
+    def _forget_next_entry(self) -> None:
+        with self._next_entry_lock:
+            self._next_entry = None
+            self._appended_entry = None
+
+    def on_playlist_pos(self, name: str, value: Any) -> None:
+        """Follows mpv when it moves on to the appended track by itself."""
+        if value != 1:
+            return
+        with self._next_entry_lock:
+            entry = self._appended_entry
+            self._next_entry = None
+            self._appended_entry = None
+        if not entry or self.state == State.Stopped:
+            return
+        track, index = entry
+        # Se a faixa anterior falhou no meio, a posição dela continua valendo
+        self._end_playing_track(
+            self._end_file_reason == mpv.MpvEventEndFile.EOF, track
+        )
+        if self.mode == Mode.Queue:
+            if self._queue_active_track:
+                self._consume_current_queue_track()
+            self.track_list = list(self.cache.queue)
+            self._queue_active_track = True
+            index = 0
+        self.track_index = index
+        self.track = track
+        self._add_to_recents()
+        self._position_saved_for_track = None
+        self._stream_expired = False
+        self._expired_stream_track = None
+        try:
+            # A faixa anterior sai da playlist, a atual volta a ser a de índice 0
+            self._player.command("playlist-remove", 0)
+        except Exception:
+            pass
+        self._notify_metadata()
+        self.prefetch()
+
+    def _get_upcoming_tracks(self, count: int) -> List[Track]:
+        if self.mode == Mode.Queue:
+            start = 1 if self._queue_active_track else 0
+            return self.cache.queue[start : start + count]
+        if self.mode in (Mode.SingleTrack, Mode.RepeatTrack) or not self.track_list:
+            return []
+        if self.mode == Mode.Random:
+            try:
+                position = self._index_list.index(self.track_index)
+            except (AttributeError, ValueError):
+                return []
+            indexes = self._index_list[position + 1 : position + 1 + count]
+        else:
+            indexes = [self.track_index + i for i in range(1, count + 1)]
+            if self.mode == Mode.RepeatTrackList:
+                indexes = [i % len(self.track_list) for i in indexes]
+        return [
+            self.track_list[i]
+            for i in indexes
+            if 0 <= i < len(self.track_list) and i != self.track_index
+        ]
 
     def _play_queue_from_start(self) -> None:
         if not self.cache.queue:
@@ -143,11 +418,11 @@ class Player:
         self.track_index = 0
         self.track = self.track_list[self.track_index]
         self._queue_active_track = True
-        self._play(self.track.url)
+        self._play(self._get_stream_url(self.track))
 
     def _consume_current_queue_track(self) -> None:
         if self.cache.queue and self.cache.queue[0].url == self.track.url:
-            self.cache.queue.pop(0)
+            self.cache.remove_from_queue(0)
             self.cache_manager.save()
         self._queue_active_track = False
 
@@ -155,40 +430,62 @@ class Player:
         if not self.cache.queue:
             raise errors.NothingIsPlayingError()
         self._play_queue_from_start()
-        self._player.volume = self.volume
+        self.volume_fader.set_volume(self.volume)
         self.state = State.Playing
         self._position_saved_for_track = None
 
-    def _save_position_marker(self) -> None:
-        if not self.general_config.enable_positions:
-            return
-        if not self.track or not self.track.url:
-            return
-        if self.track.type == TrackType.Live:
-            return
-        try:
-            position = float(self._player.time_pos or 0)
-            duration_value = self._player.duration
-            duration = float(duration_value) if duration_value else None
-        except Exception:
-            return
-        self.track.resume_position = position
-        self.track.resume_duration = duration if duration else 0
-        try:
-            for recent_track in reversed(self.cache.recents):
-                if recent_track.url == self.track.url:
-                    recent_track.resume_position = position
-                    recent_track.resume_duration = duration if duration else 0
-                    break
-        except Exception:
-            ...
-        try:
-            self.cache_manager.save()
-        except Exception:
-            logging.error("Failed to save positions", exc_info=True)
+    def save_position(self) -> Optional[Tuple[float, float]]:
+        """Saves the position of the current track and returns it with the duration.
 
-    def _clear_position_entry(self) -> None:
-        pass
+        Returns None when there's nothing to save: positions are disabled, the track
+        is live or finished, or mpv hasn't reported a position for it yet.
+        """
+        if not self.general_config.enable_positions:
+            return None
+        # Sob o lock, a troca de faixa não acontece entre ler a faixa e o relógio
+        with self._position_lock:
+            track = self._playing_track
+            if not track or track is not self.track or not track.url:
+                return None
+            if track.type == TrackType.Live:
+                return None
+            snapshot = self.snapshot()
+            if snapshot.position is None:
+                return None
+            position = float(snapshot.position)
+            duration = float(snapshot.duration) if snapshot.duration else 0
+            try:
+                self.positions.update(track.position_key, position, duration)
+            except Exception:
+                logging.error("Failed to save position", exc_info=True)
+                return None
+        return position, duration
+
+    def _checkpoint_position(self) -> None:
+        if self.state == State.Playing and not self.snapshot().idle:
+            self.save_position()
+
+    def _end_playing_track(
+        self, played_to_end: bool, next_track: Optional[Track] = None
+    ) -> None:
+        """Moves on from the track mpv was playing, forgetting its position if it
+        played to the end.
+
+        next_track is the track mpv went on to by itself, on the gapless path.
+        """
+        with self._position_lock:
+            track = self._playing_track
+            self._playing_track = next_track
+            if (
+                not played_to_end
+                or not track
+                or not self.general_config.enable_positions
+            ):
+                return
+            try:
+                self.positions.remove(track.position_key)
+            except Exception:
+                logging.error("Failed to clear position", exc_info=True)
 
     def next(self) -> None:
         if self.mode == Mode.Queue:
@@ -196,7 +493,7 @@ class Player:
                 self._consume_current_queue_track()
             if self.cache.queue:
                 self._play_queue_from_start()
-                self._player.volume = self.volume
+                self.volume_fader.set_volume(self.volume)
                 self.state = State.Playing
                 return
             else:
@@ -254,7 +551,7 @@ class Player:
         if index < len(self.track_list) and index >= (0 - len(self.track_list)):
             self.track = self.track_list[index]
             self.track_index = self.track_list.index(self.track)
-            self._play(self.track.url)
+            self._play(self._get_stream_url(self.track))
             self.state = State.Playing
         else:
             raise errors.IncorrectTrackIndexError()
@@ -263,12 +560,12 @@ class Player:
         volume = volume if volume <= self.config.max_volume else self.config.max_volume
         self.volume = volume
         if self.config.volume_fading:
-            n = 1 if self._player.volume < volume else -1
-            for i in range(int(self._player.volume), volume, n):
-                self._player.volume = i
-                time.sleep(self.config.volume_fading_interval)
+            self.volume_fader.fade_to(volume)
         else:
-            self._player.volume = volume
+            self.volume_fader.set_volume(volume)
+
+    def _set_player_volume(self, volume: float) -> None:
+        self._player.volume = volume
 
     def _clear_bass_boost(self) -> None:
         try:
@@ -341,7 +638,11 @@ class Player:
             self.stop()
 
     def get_duration(self) -> float:
-        return self._player.duration
+        return self.snapshot().duration
+
+    def snapshot(self) -> PlaybackSnapshot:
+        """Returns position, duration, pause and idle state observed together."""
+        return self.clock.snapshot()
 
     def seek_absolute(self, position: float) -> None:
         if position < 0:
@@ -385,6 +686,8 @@ class Player:
         self._player.event_callback(callback_name)(callback_func)
 
     def log_handler(self, level: str, component: str, message: str) -> None:
+        if re_expired_stream.search(message):
+            self._stream_expired = True
         logging.log(self._log_level, "{}: {}: {}".format(level, component, message))
 
     def _parse_metadata(self, metadata: Dict[str, Any]) -> str:
@@ -405,19 +708,70 @@ class Player:
         chunks.append(stream_name) if stream_name else ...
         return " - ".join(chunks)
 
+    def _reload_expired_stream(self) -> bool:
+        # Só tenta uma vez por faixa, para não entrar em loop com links quebrados
+        if self._expired_stream_track is self.track or not self.track.invalidate():
+            return False
+        logging.info("Stream link expired, resolving the track again")
+        self._expired_stream_track = self.track
+        self._play(self._get_stream_url(self.track), save_to_recents=False)
+        return True
+
+    def _reload_expired_stream_instead_of_next_entry(self) -> None:
+        """Handles an expired link when mpv has already gone on to the appended track.
+
+        The appended track is dropped and the current one is resolved again. If
+        that's not possible, mpv is left to play the appended track.
+        """
+        with self._next_entry_lock:
+            entry = self._appended_entry
+            self._appended_entry = None
+        if not entry:
+            return
+        try:
+            if self._reload_expired_stream():
+                return
+        except Exception:
+            logging.error("Failed to reload expired stream", exc_info=True)
+        with self._next_entry_lock:
+            if not self._appended_entry and self._is_same_entry(
+                entry, self._next_entry
+            ):
+                self._appended_entry = entry
+
     def on_end_file(self, event: mpv.MpvEvent) -> None:
-        if self.state == State.Playing and self._player.idle_active:
+        end_file = event["event"]
+        # Guardado mesmo quando o mpv não fica ocioso: no modo sem pausas ele passa
+        # sozinho para a faixa anexada, e on_playlist_pos precisa saber o motivo
+        self._end_file_reason = end_file["reason"] if end_file else None
+        expired = (
+            self._stream_expired
+            and self._end_file_reason == mpv.MpvEventEndFile.ERROR
+        )
+        # Lido direto do mpv: o snapshot pode ainda não ter recebido a mudança de idle
+        if self.state == State.Playing and not self._player.idle_active:
+            if expired:
+                self._reload_expired_stream_instead_of_next_entry()
+        elif self.state == State.Playing:
             if self._suppress_position_clear:
                 self._suppress_position_clear = False
                 return
-            self._clear_position_entry()
+            if expired:
+                try:
+                    if self._reload_expired_stream():
+                        return
+                except Exception:
+                    logging.error("Failed to reload expired stream", exc_info=True)
+            self._end_playing_track(
+                self._end_file_reason == mpv.MpvEventEndFile.EOF
+            )
             if self.mode == Mode.Queue:
                 if self._queue_active_track:
                     self._consume_current_queue_track()
                 if self.cache.queue:
                     try:
                         self._play_queue_from_start()
-                        self._player.volume = self.volume
+                        self.volume_fader.set_volume(self.volume)
                         self.state = State.Playing
                     except errors.NoNextTrackError:
                         self.stop()
@@ -447,3 +801,4 @@ class Player:
                 new_name = html.unescape(self._player.media_title)
             if self.track.name != new_name and new_name:
                 self.track.name = new_name
+                self._notify_metadata()
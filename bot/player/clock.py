@@ -0,0 +1,78 @@
+from __future__ import annotations
+from threading import Lock
+from typing import Any, Dict, Optional
+
+
+class PlaybackSnapshot:
+    """Playback state at one moment; never changed after it's created."""
+
+    def __init__(
+        self,
+        position: Optional[float] = None,
+        duration: Optional[float] = None,
+        paused: bool = False,
+        idle: bool = True,
+    ) -> None:
+        self.position = position
+        self.duration = duration
+        self.paused = paused
+        self.idle = idle
+
+
+class PlaybackClock:
+    """Keeps mpv's time-pos, duration, pause and idle state as observed values.
+
+    mpv pushes every change to on_property_change, and readers get the latest
+    snapshot without calling into libmpv, with all four values taken together.
+    """
+
+    # Propriedade do mpv -> campo do snapshot
+    properties: Dict[str, str] = {
+        "time-pos": "position",
+        "duration": "duration",
+        "pause": "paused",
+        "idle-active": "idle",
+    }
+
+    def __init__(self) -> None:
+        self._snapshot = PlaybackSnapshot()
+        self._lock = Lock()
+        self._awaiting_file = False
+
+    def observe(self, player: Any) -> None:
+        for name in self.properties:
+            player.observe_property(name, self.on_property_change)
+
+    def expect_file(self) -> None:
+        """Forgets position and duration until mpv starts the file being loaded.
+
+        Changes of the previous file still waiting in mpv's event queue are ignored,
+        so they are never taken for the position of the new one.
+        """
+        with self._lock:
+            self._awaiting_file = True
+            self._update(position=None, duration=None)
+
+    def on_start_file(self, _: Any = None) -> None:
+        with self._lock:
+            self._awaiting_file = False
+            self._update(position=None, duration=None)
+
+    def on_property_change(self, name: str, value: Any) -> None:
+        field = self.properties[name]
+        with self._lock:
+            if self._awaiting_file and field in ("position", "duration"):
+                return
+            self._update(**{field: value})
+
+    def _update(self, **changes: Any) -> None:
+        fields = dict(vars(self._snapshot))
+        fields.update(changes)
+        if fields["paused"] is None:
+            fields["paused"] = False
+        if fields["idle"] is None:
+            fields["idle"] = True
+        self._snapshot = PlaybackSnapshot(**fields)
+
+    def snapshot(self) -> PlaybackSnapshot:
+        return self._snapshot
@@ -0,0 +1,38 @@
+from __future__ import annotations
+import os
+import tempfile
+from typing import Any, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bot.config.models import SoundDevicesModel
+
+
+SAMPLE_WIDTH = 2  # s16
+
+
+def create_fifo() -> str:
+    """Creates the named pipe mpv writes raw PCM to, raises OSError where unsupported."""
+    if not hasattr(os, "mkfifo"):
+        raise OSError("Named pipes are not supported on this platform")
+    path = os.path.join(tempfile.mkdtemp(prefix="ttmediabot-"), "audio.pcm")
+    os.mkfifo(path)
+    return path
+
+
+def remove_fifo(path: str) -> None:
+    try:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass
+
+
+def get_mpv_options(config: SoundDevicesModel, path: str) -> Dict[str, Any]:
+    return {
+        "ao": "pcm",
+        "ao_pcm_file": path,
+        "ao_pcm_waveheader": False,
+        "audio_format": "s16",
+        "audio_samplerate": config.pcm_sample_rate,
+        "audio_channels": "stereo" if config.pcm_channels == 2 else "mono",
+    }
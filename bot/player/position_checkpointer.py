@@ -0,0 +1,29 @@
+from __future__ import annotations
+import logging
+from threading import Event, Thread
+from typing import Callable
+
+
+class PositionCheckpointer(Thread):
+    """Saves the resume position every few seconds while a track plays.
+
+    Pause, stop and track changes still save right away; this only bounds what a
+    crash in the middle of a long track can lose.
+    """
+
+    def __init__(self, checkpoint: Callable[[], None], interval: float) -> None:
+        super().__init__(daemon=True)
+        self.name = "PositionCheckpointer"
+        self._checkpoint = checkpoint
+        self.interval = interval
+        self._close = Event()
+
+    def run(self) -> None:
+        while not self._close.wait(self.interval):
+            try:
+                self._checkpoint()
+            except Exception:
+                logging.error("Failed to checkpoint position", exc_info=True)
+
+    def close(self) -> None:
+        self._close.set()
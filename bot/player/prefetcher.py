@@ -0,0 +1,51 @@
+from __future__ import annotations
+import logging
+from threading import Condition, Thread
+from typing import List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bot.player.track import Track
+
+
+class TrackPrefetcher(Thread):
+    """Resolves upcoming dynamic tracks in the background while the current one plays."""
+
+    def __init__(self) -> None:
+        super().__init__(daemon=True)
+        self.name = "TrackPrefetcher"
+        self._tracks: List[Track] = []
+        self._condition = Condition()
+        self._close = False
+        self.resolved_count = 0
+        self.failed_count = 0
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._tracks and not self._close:
+                    self._condition.wait()
+                if self._close:
+                    break
+                track = self._tracks.pop(0)
+            try:
+                track.resolve().result()
+                self.resolved_count += 1
+            except Exception:
+                self.failed_count += 1
+                logging.warning("Failed to prefetch track", exc_info=True)
+
+    def schedule(self, tracks: List[Track]) -> None:
+        """Replaces the pending list: only the latest upcoming tracks matter."""
+        with self._condition:
+            self._tracks = [
+                track
+                for track in tracks
+                if not track.is_resolved
+            ]
+            self._condition.notify()
+
+    def close(self) -> None:
+        with self._condition:
+            self._close = True
+            self._tracks = []
+            self._condition.notify()
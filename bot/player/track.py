@@ -1,5 +1,7 @@
 from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
 import copy
+import json
 import os
 from threading import Lock
 from typing import Any, Dict, Optional, TYPE_CHECKING
@@ -11,6 +13,35 @@ if TYPE_CHECKING:
     from bot.services import Service
 
 
+TRACK_RECORD_VERSION = 1
+RESOLVE_WORKERS = 4
+
+# Resoluções acontecem aqui, nunca em quem só lê url/name
+_resolver = ThreadPoolExecutor(
+    max_workers=RESOLVE_WORKERS, thread_name_prefix="TrackResolver"
+)
+
+
+def get_resolution_key(extra_info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Reduces service info to the fields needed to resolve a track again."""
+    if not extra_info:
+        return None
+    if "track_id" in extra_info:
+        return {"track_id": extra_info["track_id"]}
+    url = (
+        extra_info.get("webpage_url")
+        or extra_info.get("original_url")
+        or extra_info.get("url")
+    )
+    if url:
+        return {
+            "_type": "url",
+            "url": url,
+            "ie_key": extra_info.get("ie_key") or extra_info.get("extractor_key"),
+        }
+    return None
+
+
 class Track:
     format: str
     type: TrackType
@@ -34,8 +65,11 @@ class Track:
         self.resume_duration: Optional[float] = None
         self._lock = Lock()
         self._is_fetched = False
+        self._stale = False
+        self._resolving: Optional[Future[Track]] = None
 
     def download(self, directory: str) -> str:
+        self.resolve().result()
         service: Service = get_service_by_name(self.service)
         file_name = self.name + "." + self.format
         file_name = utils.clean_file_name(file_name)
@@ -43,25 +77,65 @@ class Track:
         service.download(self, file_path)
         return file_path
 
-    def _fetch_stream_data(self):
-        if self.type != TrackType.Dynamic or self._is_fetched:
-            return
-        self._original_track = copy.deepcopy(self)
-        service: Service = get_service_by_name(self.service)
-        track = service.get(self._url, extra_info=self.extra_info, process=True)[0]
-        self.url = track.url
-        self.name = track.name
-        self._original_track.name = track.name
-        self.format = track.format
-        self.type = track.type
-        self.extra_info = track.extra_info
-        self._is_fetched = True
+    def resolve(self) -> Future[Track]:
+        """Starts resolving a dynamic track and returns a future with the resolved track.
+
+        Concurrent callers share the same future, so a track is only resolved once.
+        """
+        with self._lock:
+            if self.type != TrackType.Dynamic or self._is_fetched:
+                future: Future[Track] = Future()
+                future.set_result(self)
+                return future
+            if not self._resolving or self._resolving.done():
+                self._resolving = _resolver.submit(self._resolve)
+            return self._resolving
+
+    def _resolve(self) -> Track:
+        with self._lock:
+            service, url, extra_info, stale = (
+                self.service,
+                self._url,
+                self.extra_info,
+                self._stale,
+            )
+        track: Track = resolve_track(service, url, extra_info, refresh=stale)
+        with self._lock:
+            if self._is_fetched:
+                return self
+            original_track = copy.deepcopy(self)
+            original_track.name = track.name
+            self._original_track = original_track
+            self._stale = False
+            self._url = track.url
+            self._name = track.name
+            self.format = track.format
+            self.type = track.type
+            self.extra_info = track.extra_info
+            self._is_fetched = True
+        return self
+
+    def invalidate(self) -> bool:
+        """Drops the resolved stream, so the next access resolves the track again."""
+        with self._lock:
+            original = self.__dict__.pop("_original_track", None)
+            if not original:
+                return False
+            self._url = original._url
+            self.format = original.format
+            self.type = original.type
+            self.extra_info = original.extra_info
+            self._is_fetched = False
+            self._stale = True
+            return True
+
+    @property
+    def is_resolved(self) -> bool:
+        return self.type != TrackType.Dynamic or self._is_fetched
 
     @property
     def url(self) -> str:
-        with self._lock:
-            self._fetch_stream_data()
-            return self._url
+        return self._url
 
     @url.setter
     def url(self, value: str) -> None:
@@ -69,15 +143,35 @@ class Track:
 
     @property
     def name(self) -> str:
-        with self._lock:
-            if not self._name:
-                self._fetch_stream_data()
-            return self._name
+        return self._name
 
     @name.setter
     def name(self, value: str) -> None:
         self._name = value
 
+    @property
+    def display_name(self) -> str:
+        """Name for listings and replies, available without resolving the track."""
+        if self._name:
+            return self._name
+        if self._url:
+            return self._url
+        key = get_resolution_key(self.extra_info)
+        if key and "url" in key:
+            return key["url"]
+        if key and "track_id" in key:
+            return "{}: {}".format(self.service, key["track_id"])
+        return self.service
+
+    @property
+    def position_key(self) -> str:
+        """Identity of the track as it was added, the same before and after resolving."""
+        source = getattr(self, "_original_track", self)
+        if source._url:
+            return "{}:{}".format(source.service, source._url)
+        key = get_resolution_key(source.extra_info)
+        return "{}:{}".format(source.service, json.dumps(key, sort_keys=True))
+
     def get_meta(self) -> Dict[str, Any]:
         try:
             return {"name": self.name, "url": self.url}
@@ -104,6 +198,46 @@ class Track:
             raw._is_fetched = self._is_fetched
             return raw
 
+    def get_record(self) -> Dict[str, Any]:
+        source = getattr(self, "_original_track", self)
+        return {
+            "record_version": TRACK_RECORD_VERSION,
+            "service": source.service,
+            "url": source._url,
+            "name": self._name or source._name,
+            "format": source.format,
+            "type": source.type.value,
+            "resume_position": self.resume_position,
+            "resume_duration": self.resume_duration,
+            "key": get_resolution_key(source.extra_info)
+            if source.type == TrackType.Dynamic
+            else None,
+        }
+
+    def _set_record(self, record: Dict[str, Any]) -> None:
+        self.service = record["service"]
+        self._url = record["url"]
+        self._name = record["name"]
+        self.format = record["format"]
+        self.type = TrackType(record["type"])
+        self.extra_info = record["key"]
+        self.resume_position = record["resume_position"]
+        self.resume_duration = record["resume_duration"]
+        self._is_fetched = False
+        self._stale = False
+        self._resolving = None
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> Track:
+        track = cls()
+        track._set_record(record)
+        return track
+
+    def compact(self) -> None:
+        record = self.get_record()
+        self.__dict__.pop("_original_track", None)
+        self._set_record(record)
+
     def __bool__(self):
         if self.service or self.url:
             return True
@@ -111,10 +245,14 @@ class Track:
             return False
 
     def __getstate__(self) -> Dict[str, Any]:
-        state: Dict[str, Any] = self.__dict__.copy()
-        del state["_lock"]
-        return state
+        return self.get_record()
 
     def __setstate__(self, state: Dict[str, Any]):
-        self.__dict__.update(state)
+        if "record_version" in state:
+            self._set_record(state)
+        else:
+            # Formato antigo: o estado completo do objeto foi serializado
+            self._stale = False
+            self.__dict__.update(state)
+        self._resolving = None
         self._lock = Lock()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import logging
+import math
+from threading import Condition, Thread
+import time
+from typing import Callable, Dict, Optional
+
+
+fade_curves: Dict[str, Callable[[float], float]] = {
+    "linear": lambda progress: progress,
+    "ease_in": lambda progress: progress**2,
+    "ease_out": lambda progress: 1 - (1 - progress) ** 2,
+    "ease_in_out": lambda progress: progress * progress * (3 - 2 * progress),
+    # Passos iguais em dB soam mais naturais do que passos iguais em volume
+    "exponential": lambda progress: (math.pow(10, progress) - 1) / 9,
+}
+
+
+class Fade:
+    def __init__(self, start: float, target: float, duration: float) -> None:
+        self.start = start
+        self.target = target
+        self.duration = duration
+        self.started_at = time.monotonic()
+
+
+class VolumeFader(Thread):
+    """Fades mpv's volume on its own thread, so volume commands return at once.
+
+    A new fade replaces the one in progress and starts from the current volume. A
+    fade takes interval seconds per unit of volume, like the old blocking fade did.
+    """
+
+    def __init__(
+        self,
+        get_volume: Callable[[], float],
+        set_volume: Callable[[float], None],
+        interval: float,
+        curve: str,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.name = "VolumeFader"
+        self._get_volume = get_volume
+        self._set_volume = set_volume
+        self.interval = max(interval, 0.005)
+        if curve not in fade_curves:
+            logging.warning("Unknown volume fading curve %s, using linear", curve)
+            curve = "linear"
+        self._curve = fade_curves[curve]
+        self._fade: Optional[Fade] = None
+        self._condition = Condition()
+        self._close = False
+
+    def fade_to(self, target: float) -> None:
+        start = self._get_volume()
+        with self._condition:
+            self._fade = Fade(start, target, abs(target - start) * self.interval)
+            self._condition.notify()
+
+    def set_volume(self, volume: float) -> None:
+        """Cancels any fade and sets the volume right away."""
+        with self._condition:
+            self._fade = None
+            self._set_volume(volume)
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._fade and not self._close:
+                    self._condition.wait()
+                if self._close:
+                    break
+                fade = self._fade
+                progress = (
+                    min((time.monotonic() - fade.started_at) / fade.duration, 1)
+                    if fade.duration
+                    else 1
+                )
+                if progress >= 1:
+                    self._fade = None
+                volume = fade.start + (fade.target - fade.start) * self._curve(
+                    progress
+                )
+                # Sob o lock, para um fade cancelado não escrever depois do novo volume
+                try:
+                    self._set_volume(round(volume))
+                except Exception:
+                    logging.error("Failed to set volume", exc_info=True)
+                if progress < 1:
+                    self._condition.wait(self.interval)
+
+    def close(self) -> None:
+        with self._condition:
+            self._close = True
+            self._fade = None
+            self._condition.notify()
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from threading import Lock
+from typing import Any, Dict, IO, Optional, Tuple
+
+
+position_type = Tuple[float, float]
+MAX_POSITIONS = 1000
+JOURNAL_COMPACTION_THRESHOLD = 1000
+
+
+class PositionStore:
+    """Resume positions keyed by track identity.
+
+    Every update is one JSON line appended to the journal, so checkpoints during
+    playback never rewrite the cache. The journal is folded into the snapshot
+    file once it gets long, and on load a damaged tail left by a crash is skipped.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.snapshot_file = os.path.join(directory, "positions.json")
+        self.journal_file = os.path.join(directory, "positions.journal")
+        self._positions: Dict[str, position_type] = {}
+        self._lock = Lock()
+        self._journal: Optional[IO[str]] = None
+        self._journal_length = 0
+        self.write_count = 0
+        self.existed = os.path.isfile(self.snapshot_file) or os.path.isfile(
+            self.journal_file
+        )
+        self._load()
+        self._compact()
+
+    def get(self, key: str) -> Optional[position_type]:
+        return self._positions.get(key)
+
+    def update(self, key: str, position: float, duration: float) -> None:
+        with self._lock:
+            if self._positions.get(key) == (position, duration):
+                return
+            self._set(key, position, duration)
+            self._append({"k": key, "p": position, "d": duration})
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            if self._positions.pop(key, None) is None:
+                return
+            self._append({"k": key})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._positions.clear()
+            self._compact()
+
+    def close(self) -> None:
+        with self._lock:
+            self._compact()
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+
+    def _set(self, key: str, position: float, duration: float) -> None:
+        # Reinsere no fim: a ordem do dicionário é a ordem de uso
+        self._positions.pop(key, None)
+        self._positions[key] = (position, duration)
+        if len(self._positions) > MAX_POSITIONS:
+            del self._positions[next(iter(self._positions))]
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        if "p" in record:
+            self._set(record["k"], float(record["p"]), float(record["d"] or 0))
+        else:
+            self._positions.pop(record["k"], None)
+
+    def _load(self) -> None:
+        try:
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                for key, position, duration in json.load(f):
+                    self._set(key, float(position), float(duration))
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logging.error("Failed to load positions", exc_info=True)
+        try:
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._apply(json.loads(line))
+                    except Exception:
+                        logging.warning("Ignoring damaged positions journal tail")
+                        break
+        except FileNotFoundError:
+            pass
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        self.write_count += 1
+        if self._journal_length >= JOURNAL_COMPACTION_THRESHOLD:
+            self._compact()
+            return
+        try:
+            if not self._journal:
+                self._journal = open(self.journal_file, "a", encoding="utf-8")
+            self._journal.write(json.dumps(record) + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        except OSError:
+            logging.error("Failed to write position", exc_info=True)
+            return
+        self._journal_length += 1
+
+    def _compact(self) -> None:
+        content = json.dumps(
+            [
+                [key, position, duration]
+                for key, (position, duration) in self._positions.items()
+            ]
+        )
+        temp_file_name = self.snapshot_file + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_file), exist_ok=True)
+            with open(temp_file_name, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file_name, self.snapshot_file)
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+            with open(self.journal_file, "w", encoding="utf-8"):
+                pass
+        except OSError:
+            logging.error("Failed to compact positions", exc_info=True)
+            return
+        self._journal_length = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "positions": len(self._positions),
+            "journal_length": self._journal_length,
+            "writes": self.write_count,
+        }
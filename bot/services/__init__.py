@@ -1,15 +1,22 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from concurrent import futures
+from concurrent.futures import Future, ThreadPoolExecutor
+import copy
 import logging
-from typing import Any, Dict, List, Optional, TYPE_CHECKING
+import os
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, List, Optional, TYPE_CHECKING
 
 import downloader
 
 from bot import app_vars, errors
+from bot.services.circuit_breaker import CircuitBreaker
+from bot.services.search_cache import SearchCache, normalize_query
+from bot.services.stream_cache import StreamCache, stream_key_type
 
 if TYPE_CHECKING:
     from bot import Bot
-    from bot.player.track import Track
 
 
 class Service(ABC):
@@ -20,6 +27,19 @@ class Service(ABC):
     error_message: str
     warning_message: str
     help: str
+    # Serviços remotos passam pelo circuit breaker e pelo prazo de chamada
+    is_remote: bool = True
+
+    def close(self) -> None:
+        pass
+
+    def is_failure(self, error: Exception) -> bool:
+        """Tells whether an error means the service itself is failing.
+
+        Only these count against the circuit breaker; errors caused by the request,
+        like a bad or unsupported link, don't.
+        """
+        return isinstance(error, (OSError, errors.ServiceTransportError))
 
     def download(self, track: Track, file_path: str) -> None:
         downloader.download_file(track.url, file_path)
@@ -33,6 +53,12 @@ class Service(ABC):
     ) -> List[Track]:
         ...
 
+    def get_track_id(
+        self, url: str, extra_info: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """Returns a stable id of the track on the service, None if it has none."""
+        return None
+
     @abstractmethod
     def initialize(self) -> None:
         ...
@@ -46,6 +72,8 @@ from bot.services.vk import VkService
 from bot.services.yam import YamService
 from bot.services.yt import YtService
 from bot.services.dropbox import DropboxService
+from bot.services.federated import FederatedService
+from bot.player.track import Track
 
 
 class ServiceManager:
@@ -57,12 +85,51 @@ class ServiceManager:
             "dropbox": DropboxService(bot, self.config.dropbox),
             "yt": YtService(bot, self.config.yt),
             "dropbox": DropboxService(bot, self.config.dropbox),
+            "all": FederatedService(bot, self.config.federated),
         }
         self.service: Service = self.services[self.config.default_service]
         self.fallback_service = app_vars.fallback_service
+        self.stream_cache = StreamCache(
+            self.config.stream_cache_ttl, self.config.stream_cache_refresh_margin
+        )
+        search_cache_file_name = self.config.search_cache_file_name
+        if search_cache_file_name and not os.path.isabs(search_cache_file_name):
+            search_cache_file_name = os.path.join(
+                bot.config_manager.config_dir, search_cache_file_name
+            )
+        self.search_cache = SearchCache(
+            self.config.search_cache_size,
+            self.config.search_cache_ttl,
+            self.config.search_cache_negative_ttl,
+            search_cache_file_name,
+        )
+        self.search_cache.load()
+        # Pedidos idênticos em andamento, quem chega depois espera o mesmo resultado
+        self._in_flight: Dict[Hashable, Future[Any]] = {}
+        self._in_flight_lock = Lock()
+        self.coalesced_count = 0
+        breaker_config = self.config.circuit_breaker
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {
+            name: CircuitBreaker(
+                breaker_config.failure_threshold, breaker_config.reset_timeout
+            )
+            for name, service in self.services.items()
+            if service.is_remote
+        }
+        self._call_executors: Dict[str, ThreadPoolExecutor] = {
+            name: ThreadPoolExecutor(
+                max_workers=max(breaker_config.call_workers, 1),
+                thread_name_prefix="ServiceCall-{}".format(name),
+            )
+            for name in self.circuit_breakers
+        }
+        self._refresh_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="StreamRefresh"
+        )
         import builtins
 
         builtins.__dict__["get_service_by_name"] = self.get_service_by_name
+        builtins.__dict__["resolve_track"] = self.resolve
 
     def initialize(self) -> None:
         logging.debug("Initializing services")
@@ -78,6 +145,13 @@ class ServiceManager:
                     self.service = self.services[self.fallback_service]
         logging.debug("Services initialized")
 
+    def close(self) -> None:
+        self.search_cache.save()
+        for service in self.services.values():
+            service.close()
+        for executor in self._call_executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def get_service_by_name(self, name: str) -> Service:
         try:
             service = self.services[name]
@@ -86,3 +160,200 @@ class ServiceManager:
             return service
         except KeyError as e:
             raise errors.ServiceNotFoundError(str(e))
+
+    def search(
+        self, query: str, service: Optional[Service] = None, fallback: bool = True
+    ) -> List[Track]:
+        """Searches the current service, or the given one, through the search cache.
+
+        Raises errors.NothingFoundError for empty results, which are cached as well.
+        If the service is unavailable the fallback service is searched instead.
+        """
+        if not service:
+            service = self.service
+        key = (service.name, normalize_query(query))
+        records = self.search_cache.get(key)
+        if records is not None:
+            if not records:
+                raise errors.NothingFoundError()
+            return [Track.from_record(record) for record in records]
+        try:
+            tracks = self._single_flight(
+                ("search",) + key,
+                self._call,
+                service,
+                service.search,
+                query,
+                copy_result=True,
+            )
+        except errors.NothingFoundError:
+            self.search_cache.put(key, [])
+            raise
+        except errors.ServiceUnavailableError:
+            fallback_service = self.services[self.fallback_service]
+            if not fallback or service is fallback_service:
+                raise
+            logging.info(
+                "%s is unavailable, searching %s instead",
+                service.name,
+                fallback_service.name,
+            )
+            return self.search(query, fallback_service, fallback=False)
+        self.search_cache.put(key, [track.get_record() for track in tracks])
+        if not tracks:
+            raise errors.NothingFoundError()
+        return tracks
+
+    def get(self, service: Service, url: str) -> List[Track]:
+        return self._single_flight(
+            ("get", service.name, url),
+            self._call,
+            service,
+            service.get,
+            url,
+            copy_result=True,
+        )
+
+    def _call(
+        self, service: Service, function: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """Calls the service within its deadline, unless its circuit is open.
+
+        Raises errors.ServiceUnavailableError instead of waiting on a service that
+        is down or too slow.
+        """
+        circuit_breaker = self.circuit_breakers.get(service.name)
+        if not circuit_breaker:
+            return function(*args, **kwargs)
+        if not circuit_breaker.allow():
+            raise errors.ServiceUnavailableError(service.name)
+        future = self._call_executors[service.name].submit(function, *args, **kwargs)
+        timeout = self.config.circuit_breaker.call_timeouts.get(
+            service.name, self.config.circuit_breaker.call_timeout
+        )
+        try:
+            result = future.result(timeout=timeout)
+        except futures.TimeoutError:
+            circuit_breaker.record_failure()
+            logging.warning(
+                "%s didn't answer within %s seconds", service.name, timeout
+            )
+            raise errors.ServiceUnavailableError(service.name)
+        except Exception as e:
+            if service.is_failure(e):
+                circuit_breaker.record_failure()
+            else:
+                # O serviço respondeu, o problema está no pedido
+                circuit_breaker.record_success()
+            raise
+        circuit_breaker.record_success()
+        return result
+
+    def _single_flight(
+        self,
+        key: Hashable,
+        function: Callable[..., Any],
+        *args: Any,
+        copy_result: bool = False,
+    ) -> Any:
+        """Runs function(*args) unless an identical call is already running.
+
+        Callers that arrive while the call runs wait for it and get its result or
+        its exception. With copy_result they get deep copies of the returned
+        tracks, so nobody shares Track objects with another request.
+        """
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced_count += 1
+        if not is_leader:
+            result = future.result()
+            return copy.deepcopy(result) if copy_result else result
+        try:
+            result = function(*args)
+        except Exception as e:
+            self._finish_flight(key)
+            future.set_exception(e)
+            raise
+        self._finish_flight(key)
+        future.set_result(result)
+        return result
+
+    def _finish_flight(self, key: Hashable) -> None:
+        with self._in_flight_lock:
+            del self._in_flight[key]
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = self.stream_cache.stats
+        stats["requests_in_flight"] = len(self._in_flight)
+        stats["coalesced_requests"] = self.coalesced_count
+        for name, circuit_breaker in self.circuit_breakers.items():
+            for stat, value in circuit_breaker.stats.items():
+                stats["{}_circuit_{}".format(name, stat)] = value
+        return stats
+
+    def _get_stream_key(
+        self, service: Service, url: str, extra_info: Optional[Dict[str, Any]]
+    ) -> Optional[stream_key_type]:
+        track_id = service.get_track_id(url, extra_info)
+        return (service.name, track_id) if track_id else None
+
+    def resolve(
+        self,
+        service_name: str,
+        url: str,
+        extra_info: Optional[Dict[str, Any]] = None,
+        refresh: bool = False,
+    ) -> Track:
+        service = self.get_service_by_name(service_name)
+        key = self._get_stream_key(service, url, extra_info)
+        if key and refresh:
+            self.stream_cache.invalidate(key)
+        elif key:
+            track = self.stream_cache.get(key)
+            if track:
+                if self.stream_cache.start_refresh(key):
+                    self._refresh_executor.submit(
+                        self._refresh, service, key, url, extra_info
+                    )
+                return track
+        if key or url:
+            track = self._single_flight(
+                ("resolve", service.name, key or url),
+                self._get_stream,
+                service,
+                url,
+                extra_info,
+            )
+        else:
+            # Sem id nem link não há como saber se dois pedidos são a mesma faixa
+            track = self._get_stream(service, url, extra_info)
+        if key:
+            self.stream_cache.put(key, track)
+        return track
+
+    def _get_stream(
+        self, service: Service, url: str, extra_info: Optional[Dict[str, Any]]
+    ) -> Track:
+        return self._call(
+            service, service.get, url, extra_info=extra_info, process=True
+        )[0]
+
+    def _refresh(
+        self,
+        service: Service,
+        key: stream_key_type,
+        url: str,
+        extra_info: Optional[Dict[str, Any]],
+    ) -> None:
+        try:
+            track = self._get_stream(service, url, extra_info)
+            self.stream_cache.put(key, track)
+        except Exception:
+            logging.warning("Failed to refresh stream %s", key, exc_info=True)
+            self.stream_cache.invalidate(key)
+
@@ -0,0 +1,74 @@
+from __future__ import annotations
+from enum import Enum
+from threading import Lock
+import time
+from typing import Dict, Union
+
+
+class CircuitState(Enum):
+    Closed = "closed"
+    Open = "open"
+    HalfOpen = "half_open"
+
+
+class CircuitBreaker:
+    """Tracks the health of one service.
+
+    After failure_threshold failures in a row the circuit opens and calls are
+    refused without touching the service. Once reset_timeout seconds have passed a
+    single probe call is let through: success closes the circuit, failure opens it
+    again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.Closed
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = Lock()
+        self.rejected_count = 0
+        self.opened_count = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CircuitState.Closed:
+                return True
+            if (
+                self.state == CircuitState.Open
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                self.state = CircuitState.HalfOpen
+            if self.state == CircuitState.HalfOpen and not self._probing:
+                self._probing = True
+                return True
+            self.rejected_count += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CircuitState.Closed
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if (
+                self.state == CircuitState.HalfOpen
+                or self._failures >= self.failure_threshold
+            ):
+                if self.state != CircuitState.Open:
+                    self.opened_count += 1
+                self.state = CircuitState.Open
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    @property
+    def stats(self) -> Dict[str, Union[int, str]]:
+        return {
+            "state": self.state.value,
+            "rejected": self.rejected_count,
+            "opened": self.opened_count,
+        }
@@ -25,6 +25,7 @@ class DropboxService(_Service):
         self.warning_message = ""
         self.help = ""
         self.hidden = False
+        self.is_remote = False
 
     def initialize(self) -> None:
         pass  # Nada a inicializar
@@ -0,0 +1,190 @@
+from __future__ import annotations
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import logging
+import re
+import time
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    from bot import Bot
+
+from bot import errors
+from bot.config.models import FederatedModel
+from bot.player.track import Track
+from bot.services import Service
+
+re_brackets = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+re_non_word = re.compile(r"\W+")
+# Palavras que os serviços acrescentam ao nome e que não dizem qual é a música
+noise_words = frozenset(
+    ("official", "video", "audio", "lyrics", "lyric", "hd", "hq", "topic", "vevo")
+)
+
+
+def get_dedupe_key(name: str) -> FrozenSet[str]:
+    """Reduces "Artist - Title (Official Video)" to {"artist", "title"}.
+
+    The key doesn't depend on word order, so "Title - Artist" gets the same one.
+    """
+    words = re_non_word.sub(" ", re_brackets.sub(" ", name.casefold())).split()
+    return frozenset(word for word in words if word not in noise_words)
+
+
+class FederatedService(Service):
+    """Searches several services at once and merges their results.
+
+    Every service gets its own deadline, slow ones are left behind once it passes,
+    and the search returns early when enough results from enough services arrived.
+    Results are interleaved in the configured service order, keeping each service's
+    own ranking, and duplicates by artist and title are dropped.
+    """
+
+    def __init__(self, bot: Bot, config: FederatedModel) -> None:
+        self.bot = bot
+        self.config = config
+        self.name = "all"
+        self.hostnames = []
+        self.is_enabled = config.enabled
+        self.error_message = ""
+        self.warning_message = ""
+        self.help = self.bot.translator.translate(
+            "Searches {} at once and merges the results"
+        ).format(", ".join(config.services))
+        self.hidden = False
+        self.is_remote = False
+        # Buscas atrasadas continuam rodando e enchem o cache, por isso a folga
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(config.services), 1) * 2,
+            thread_name_prefix="FederatedSearch",
+        )
+
+    def initialize(self) -> None:
+        pass
+
+    def get(
+        self,
+        url: str,
+        extra_info: Optional[Dict[str, Any]] = None,
+        process: bool = False,
+    ) -> List[Track]:
+        # Links tocam pelo serviço a que pertencem, "all" só busca
+        hostname = urlparse(url).hostname if url else None
+        service_manager = self.bot.service_manager
+        service: Optional[Service] = None
+        for name in self.config.services:
+            candidate = service_manager.services.get(name)
+            if (
+                candidate
+                and candidate is not self
+                and candidate.is_enabled
+                and hostname in candidate.hostnames
+            ):
+                service = candidate
+                break
+        if not service and hostname:
+            service = service_manager.services[service_manager.fallback_service]
+            if not service.is_enabled:
+                service = None
+        if service:
+            # Pelo ServiceManager, para valerem o disjuntor, o prazo e o single-flight
+            if process:
+                return [service_manager.resolve(service.name, url, extra_info)]
+            return service_manager.get(service, url)
+        raise errors.ServiceError(
+            self.bot.translator.translate(
+                "This service only searches other services, it can't open links"
+            )
+        )
+
+    def search(self, query: str) -> List[Track]:
+        service_manager = self.bot.service_manager
+        started = time.monotonic()
+        pending: Dict[Future[List[Track]], str] = {}
+        for name in self.config.services:
+            service = service_manager.services.get(name)
+            if not service or not service.is_enabled or service is self:
+                continue
+            pending[
+                self._executor.submit(
+                    service_manager.search, query, service, fallback=False
+                )
+            ] = name
+        results: Dict[str, List[Track]] = {}
+        while pending:
+            deadlines = {
+                future: started + self.config.deadlines.get(name, self.config.deadline)
+                for future, name in pending.items()
+            }
+            done, _ = wait(
+                pending,
+                timeout=max(min(deadlines.values()) - time.monotonic(), 0),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    results[name] = future.result()
+                except errors.NothingFoundError:
+                    pass
+                except Exception:
+                    logging.warning(
+                        "Federated search failed on %s", name, exc_info=True
+                    )
+            now = time.monotonic()
+            for future, deadline in deadlines.items():
+                if future in pending and deadline <= now:
+                    logging.info(
+                        "Federated search left %s behind after its deadline",
+                        pending.pop(future),
+                    )
+            if (
+                len(results) >= self.config.min_services
+                and sum(len(tracks) for tracks in results.values())
+                >= self.config.min_results
+            ):
+                break
+        tracks = self._merge(results)
+        if not tracks:
+            raise errors.NothingFoundError()
+        return tracks
+
+    def _merge(self, results: Dict[str, List[Track]]) -> List[Track]:
+        track_lists = [
+            results[name] for name in self.config.services if name in results
+        ]
+        tracks: List[Track] = []
+        seen = set()
+        seen_by_service: List[Tuple[str, FrozenSet[str]]] = []
+        for index in range(max((len(i) for i in track_lists), default=0)):
+            for track_list in track_lists:
+                if index >= len(track_list):
+                    continue
+                track = track_list[index]
+                key = get_dedupe_key(track.name)
+                if key:
+                    if key in seen or self._is_duplicate(
+                        track.service, key, seen_by_service
+                    ):
+                        continue
+                    seen.add(key)
+                    seen_by_service.append((track.service, key))
+                tracks.append(track)
+        return tracks
+
+    def _is_duplicate(
+        self,
+        service: str,
+        key: FrozenSet[str],
+        seen_by_service: List[Tuple[str, FrozenSet[str]]],
+    ) -> bool:
+        # Entre serviços o nome muda de forma: o yt acrescenta o canal, o vk põe o
+        # artista antes. Basta as palavras de um nome estarem todas no outro
+        if len(key) < 2:
+            return False
+        for seen_service, seen_key in seen_by_service:
+            if seen_service == service or len(seen_key) < 2:
+                continue
+            if key <= seen_key or seen_key <= key:
+                return True
+        return False
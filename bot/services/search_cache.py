@@ -0,0 +1,117 @@
+from __future__ import annotations
+from collections import OrderedDict
+import json
+import logging
+import os
+from threading import Lock
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+search_key_type = Tuple[str, str]
+record_list_type = List[Dict[str, Any]]
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+class SearchCacheEntry:
+    def __init__(self, records: record_list_type, expires_at: float) -> None:
+        self.records = records
+        self.expires_at = expires_at
+
+
+class SearchCache:
+    """Remembers search results by (service, normalized query) for a while.
+
+    Results are kept as track records, so every hit builds new Track objects that
+    the player can resolve without touching the cached ones. An empty list means
+    nothing was found and is kept for negative_ttl seconds only.
+    """
+
+    def __init__(
+        self, size: int, ttl: int, negative_ttl: int, file_name: str = ""
+    ) -> None:
+        self.size = size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.file_name = file_name
+        self._entries: OrderedDict[search_key_type, SearchCacheEntry] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def get(self, key: search_key_type) -> Optional[record_list_type]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires_at > time.time():
+                self._entries.move_to_end(key)
+                if entry.records:
+                    self.hits += 1
+                else:
+                    self.negative_hits += 1
+                return entry.records
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: search_key_type, records: record_list_type) -> None:
+        ttl = self.ttl if records else self.negative_ttl
+        if ttl <= 0 or self.size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = SearchCacheEntry(records, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def load(self) -> None:
+        if not self.file_name or not os.path.isfile(self.file_name):
+            return
+        try:
+            with open(self.file_name, "r", encoding="UTF-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            logging.warning("Failed to load search cache", exc_info=True)
+            return
+        now = time.time()
+        with self._lock:
+            for service, query, records, expires_at in data:
+                if expires_at > now:
+                    self._entries[(service, query)] = SearchCacheEntry(
+                        records, expires_at
+                    )
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def save(self) -> None:
+        if not self.file_name:
+            return
+        now = time.time()
+        with self._lock:
+            data = [
+                [key[0], key[1], entry.records, entry.expires_at]
+                for key, entry in self._entries.items()
+                if entry.expires_at > now
+            ]
+        try:
+            with open(self.file_name, "w", encoding="UTF-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+        except OSError:
+            logging.warning("Failed to save search cache", exc_info=True)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "search_cache_size": len(self._entries),
+            "search_cache_hits": self.hits,
+            "search_cache_negative_hits": self.negative_hits,
+            "search_cache_misses": self.misses,
+        }
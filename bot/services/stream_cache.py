@@ -0,0 +1,98 @@
+from __future__ import annotations
+from collections import OrderedDict
+import re
+from threading import Lock
+import time
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import parse_qs, urlparse
+
+if TYPE_CHECKING:
+    from bot.player.track import Track
+
+
+stream_key_type = Tuple[str, str]
+MAX_STREAM_CACHE_SIZE = 500
+# Links com menos tempo de vida que isso não são mais entregues ao mpv
+MIN_STREAM_LIFETIME = 60
+
+re_path_expire = re.compile(r"/expire/(\d+)")
+
+
+def get_expiration(url: str) -> Optional[float]:
+    """Returns the expiry timestamp embedded in a direct link, if there is one."""
+    parsed_url = urlparse(url)
+    query = parse_qs(parsed_url.query)
+    for name in ("expire", "expires"):
+        if name in query:
+            try:
+                return float(query[name][0])
+            except ValueError:
+                pass
+    match = re_path_expire.search(parsed_url.path)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class StreamCacheEntry:
+    def __init__(self, track: Track, expires_at: float) -> None:
+        self.track = track
+        self.expires_at = expires_at
+        self.refreshing = False
+
+
+class StreamCache:
+    def __init__(self, default_ttl: int, refresh_margin: int) -> None:
+        self.default_ttl = default_ttl
+        self.refresh_margin = refresh_margin
+        self._entries: OrderedDict[stream_key_type, StreamCacheEntry] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: stream_key_type) -> Optional[Track]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires_at - time.time() > MIN_STREAM_LIFETIME:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.track
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: stream_key_type, track: Track) -> None:
+        expires_at = get_expiration(track.url)
+        if not expires_at:
+            expires_at = time.time() + self.default_ttl
+        with self._lock:
+            self._entries[key] = StreamCacheEntry(track, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > MAX_STREAM_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: stream_key_type) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def start_refresh(self, key: stream_key_type) -> bool:
+        """Returns True once per entry when it is close enough to expiry to be refreshed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                not entry
+                or entry.refreshing
+                or entry.expires_at - time.time() > self.refresh_margin
+            ):
+                return False
+            entry.refreshing = True
+            return True
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "stream_cache_size": len(self._entries),
+            "stream_cache_hits": self.hits,
+            "stream_cache_misses": self.misses,
+        }
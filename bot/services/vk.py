@@ -74,6 +74,11 @@ class VkService(_Service):
             logging.error(e)
             raise errors.ServiceError(e)
 
+    def is_failure(self, error: Exception) -> bool:
+        return super().is_failure(error) or isinstance(
+            error, vk_api.exceptions.ApiHttpError
+        )
+
     def get(
         self,
         url: str,
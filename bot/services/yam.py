@@ -31,6 +31,9 @@ class YamService(Service):
         self.hidden = False
         self.format = ".mp3"
 
+    def is_failure(self, error: Exception) -> bool:
+        return super().is_failure(error) or isinstance(error, NetworkError)
+
     def initialize(self):
         self.api = Client(token=self.config.token)
         try:
@@ -47,6 +50,18 @@ class YamService(Service):
                 "You don't have Yandex Plus"
             )
 
+    def get_track_id(
+        self, url: str, extra_info: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        if extra_info and "track_id" in extra_info:
+            return str(extra_info["track_id"])
+        return None
+
+    def _get_track_name(self, track: Any) -> str:
+        if not track.title:
+            return ""
+        return "{} - {}".format(" & ".join(track.artists_name()), track.title)
+
     def get(
         self,
         url: str,
@@ -70,6 +85,7 @@ class YamService(Service):
                         tracks.append(
                             Track(
                                 service=self.name,
+                                name=self._get_track_name(track),
                                 extra_info={"track_id": track.track_id},
                                 type=TrackType.Dynamic,
                             )
@@ -84,6 +100,7 @@ class YamService(Service):
                     tracks.append(
                         Track(
                             service=self.name,
+                            name=self._get_track_name(track),
                             extra_info={"track_id": track.track_id},
                             type=TrackType.Dynamic,
                         )
@@ -128,6 +145,7 @@ class YamService(Service):
                 tracks.append(
                     Track(
                         service=self.name,
+                        name=self._get_track_name(track),
                         type=TrackType.Dynamic,
                         extra_info={"track_id": track.track_id},
                     )
@@ -140,6 +158,7 @@ class YamService(Service):
                 tracks.append(
                     Track(
                         service=self.name,
+                        name=self._get_track_name(podcast_episode),
                         type=TrackType.Dynamic,
                         extra_info={"track_id": podcast_episode.track_id},
                     )
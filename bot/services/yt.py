@@ -1,7 +1,9 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import os
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
+from urllib.parse import parse_qs, urlparse
 
 if TYPE_CHECKING:
     from bot import Bot
@@ -9,6 +11,7 @@ if TYPE_CHECKING:
 from yt_dlp import YoutubeDL
 from yt_dlp.downloader import get_suitable_downloader
 from youtubesearchpython import VideosSearch
+from ytdlp_worker import is_transport_error, strip_info
 
 from .patches import patch_channel_link_none, patch_httpx_post_proxies
 
@@ -17,13 +20,13 @@ from bot.config.models import YtModel
 from bot.player.enums import TrackType
 from bot.player.track import Track
 from bot.services import Service as _Service
+from bot.services.yt_worker import ExtractionPool
 from bot import errors,app_vars
 
 
 patch_httpx_post_proxies()
 patch_channel_link_none()
 
-
 class YtService(_Service):
     def __init__(self, bot: Bot, config: YtModel):
         self.bot = bot
@@ -35,6 +38,8 @@ class YtService(_Service):
         self.warning_message = ""
         self.help = ""
         self.hidden = False
+        self._pool: Optional[ExtractionPool] = None
+        self._entries_executor: Optional[ThreadPoolExecutor] = None
 
     def initialize(self):
         self._ydl_config = {
@@ -51,6 +56,48 @@ class YtService(_Service):
             self._ydl_config |= {"cookiefile": self.config.cookiefile_path}
         # Criar instância única do YoutubeDL para reutilizar
         self._ydl = YoutubeDL(self._ydl_config)
+        if self.config.extraction_workers > 0:
+            worker_config = dict(self._ydl_config)
+            # O logger fica no processo do bot, os workers só devolvem os erros
+            del worker_config["logger"]
+            worker_config["quiet"] = True
+            self._pool = ExtractionPool(
+                self.config.extraction_workers,
+                self.config.extraction_worker_max_jobs,
+                self.config.extraction_timeout,
+                worker_config,
+            )
+            self._pool.start()
+        self._entries_executor = ThreadPoolExecutor(
+            max_workers=max(self.config.extraction_workers, 1),
+            thread_name_prefix="YtEntries",
+        )
+
+    def close(self) -> None:
+        if self._pool:
+            self._pool.close()
+        if self._entries_executor:
+            self._entries_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _extract(self, url: str) -> Dict[str, Any]:
+        if self._pool:
+            return self._pool.extract(url)
+        try:
+            return self._ydl.extract_info(url, process=False)
+        except Exception as e:
+            if is_transport_error(e):
+                raise errors.ServiceTransportError(str(e)) from e
+            raise
+
+    def _process(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        if self._pool:
+            return self._pool.process(info)
+        try:
+            return strip_info(self._ydl.process_ie_result(info))
+        except Exception as e:
+            if is_transport_error(e):
+                raise errors.ServiceTransportError(str(e)) from e
+            raise
             
     def download(self, track: Track, file_path: str) -> None:
         info = track.extra_info
@@ -61,36 +108,80 @@ class YtService(_Service):
         dl = get_suitable_downloader(info)(self._ydl, self._ydl_config)
         dl.download(file_path, info)
 
+    def get_track_id(
+        self, url: str, extra_info: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        if extra_info:
+            if extra_info.get("id"):
+                return extra_info["id"]
+            url = url or extra_info.get("webpage_url") or extra_info.get("url", "")
+        parsed_url = urlparse(url)
+        if parsed_url.hostname == "youtu.be":
+            return parsed_url.path.strip("/") or None
+        query = parse_qs(parsed_url.query)
+        if "v" in query:
+            return query["v"][0]
+        path = parsed_url.path.split("/")
+        if len(path) == 3 and path[1] in ("shorts", "live", "embed"):
+            return path[2]
+        return None
+
     def get(
         self,
         url: str,
         extra_info: Optional[Dict[str, Any]] = None,
         process: bool = False,
+    ) -> List[Track]:
+        return self._get(url, extra_info, process)
+
+    def _get(
+        self,
+        url: str,
+        extra_info: Optional[Dict[str, Any]] = None,
+        process: bool = False,
+        nested: bool = False,
     ) -> List[Track]:
         if not (url or extra_info):
             raise errors.InvalidArgumentError()
-        # Reutilizar instância única do YoutubeDL
         if not extra_info:
-            info = self._ydl.extract_info(url, process=False)
+            info = self._extract(url)
         else:
             info = extra_info
         info_type = None
         if "_type" in info:
             info_type = info["_type"]
         if info_type == "url" and not info["ie_key"]:
-            return self.get(info["url"], process=False)
+            return self._get(info["url"], process=False, nested=nested)
         elif info_type == "playlist":
+            # Entradas sem extrator precisam de uma extração cada, feitas em paralelo.
+            # Playlists dentro de playlists ficam em série para não travar o executor
+            def get_entry(entry: Dict[str, Any]) -> List[Track]:
+                return self._get("", extra_info=entry, process=False, nested=True)
+
+            if nested:
+                results = map(get_entry, info["entries"])
+            else:
+                results = self._entries_executor.map(get_entry, info["entries"])
             tracks: List[Track] = []
-            for entry in info["entries"]:
-                data = self.get("", extra_info=entry, process=False)
+            for data in results:
                 tracks += data
             return tracks
         if not process:
+            title = info.get("title") or ""
+            if title and info.get("uploader"):
+                title += " - {}".format(info["uploader"])
             return [
-                Track(service=self.name, extra_info=info, type=TrackType.Dynamic)
+                Track(
+                    service=self.name,
+                    name=title,
+                    extra_info=info,
+                    type=TrackType.Dynamic,
+                )
             ]
         try:
-            stream = self._ydl.process_ie_result(info)
+            stream = self._process(info)
+        except errors.ServiceTransportError:
+            raise
         except Exception:
             raise errors.ServiceError()
         if "url" in stream:
@@ -115,7 +206,17 @@ class YtService(_Service):
             tracks: List[Track] = []
             for video in search["result"]:
                 try:
-                    tracks.append(Track(service=self.name, url=video["link"], type=TrackType.Dynamic))
+                    title = video["title"] or ""
+                    if title and video.get("channel") and video["channel"].get("name"):
+                        title += " - {}".format(video["channel"]["name"])
+                    tracks.append(
+                        Track(
+                            service=self.name,
+                            url=video["link"],
+                            name=title,
+                            type=TrackType.Dynamic,
+                        )
+                    )
                 except Exception:
                     continue
             return tracks
@@ -0,0 +1,129 @@
+from __future__ import annotations
+import logging
+import multiprocessing
+from queue import Queue
+from threading import Lock
+from typing import Any, Dict, List
+
+from ytdlp_worker import worker_main
+
+from bot import errors
+
+
+class ExtractionWorker:
+    def __init__(self, context: Any, ydl_config: Dict[str, Any], number: int) -> None:
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=worker_main,
+            args=(child_connection, ydl_config),
+            name="YtWorker-{}".format(number),
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+        self.jobs = 0
+
+    def call(self, method: str, arg: Any, timeout: float) -> Any:
+        self.jobs += 1
+        self.connection.send((method, arg))
+        if not self.connection.poll(timeout):
+            raise TimeoutError()
+        status, value = self.connection.recv()
+        if status == "transport_error":
+            raise errors.ServiceTransportError(value)
+        if status == "error":
+            raise errors.ServiceError(value)
+        return value
+
+    def close(self) -> None:
+        self.connection.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(1)
+
+
+class ExtractionPool:
+    """Runs yt-dlp extraction in a pool of worker processes.
+
+    Each worker is started once with yt_dlp imported and a YoutubeDL ready, so
+    extraction doesn't hold the bot's GIL. A worker that misses the timeout is
+    killed and replaced, and workers are recycled after max_jobs requests.
+    """
+
+    def __init__(
+        self, workers: int, max_jobs: int, timeout: float, ydl_config: Dict[str, Any]
+    ) -> None:
+        self.size = workers
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.ydl_config = ydl_config
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: Queue[ExtractionWorker] = Queue()
+        self._workers: List[ExtractionWorker] = []
+        self._lock = Lock()
+        self._started_count = 0
+        self.timeout_count = 0
+        self.recycled_count = 0
+
+    def start(self) -> None:
+        for _ in range(self.size):
+            self._idle.put(self._start_worker())
+
+    def extract(self, url: str) -> Dict[str, Any]:
+        return self._call("extract", url)
+
+    def process(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        return self._call("process", info)
+
+    def _call(self, method: str, arg: Any) -> Any:
+        worker = self._idle.get()
+        try:
+            return worker.call(method, arg, self.timeout)
+        except TimeoutError:
+            self.timeout_count += 1
+            logging.warning(
+                "yt-dlp worker didn't answer within %s seconds, restarting it",
+                self.timeout,
+            )
+            worker = self._replace_worker(worker)
+            raise errors.ServiceTransportError("Extraction timed out")
+        except (EOFError, OSError):
+            logging.warning("yt-dlp worker died, restarting it", exc_info=True)
+            worker = self._replace_worker(worker)
+            raise errors.ServiceTransportError("Extraction failed")
+        finally:
+            if self.max_jobs and worker.jobs >= self.max_jobs:
+                self.recycled_count += 1
+                worker = self._replace_worker(worker)
+            self._idle.put(worker)
+
+    def _start_worker(self) -> ExtractionWorker:
+        with self._lock:
+            self._started_count += 1
+            number = self._started_count
+        worker = ExtractionWorker(self._context, self.ydl_config, number)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _replace_worker(self, worker: ExtractionWorker) -> ExtractionWorker:
+        with self._lock:
+            self._workers.remove(worker)
+        worker.close()
+        return self._start_worker()
+
+    def close(self) -> None:
+        with self._lock:
+            workers = self._workers
+            self._workers = []
+        for worker in workers:
+            worker.close()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": len(self._workers),
+            "idle_workers": self._idle.qsize(),
+            "timeouts": self.timeout_count,
+            "recycled": self.recycled_count,
+        }
@@ -23,6 +23,7 @@ class SoundDeviceType(Enum):
 class SoundDeviceManager:
     def __init__(self, bot: Bot) -> None:
         self.config = bot.config
+        self.translator = bot.translator
         self.output_device_index = self.config.sound_devices.output_device
         self.input_device_index = self.config.sound_devices.input_device
         self.player = bot.player
@@ -32,6 +33,16 @@ class SoundDeviceManager:
 
     def initialize(self) -> None:
         logging.debug("Initializing sound devices")
+        if self.config.sound_devices.mode == "pcm":
+            # O áudio vai direto do mpv ao TeamTalk, sem dispositivos virtuais
+            if not self.ttclient.supports_audio_blocks:
+                error = self.translator.translate(
+                    "This TeamTalkPy build can't insert audio blocks, PCM mode is unavailable"
+                )
+                logging.error(error)
+                sys.exit(error)
+            logging.debug("Sound devices initialized")
+            return
         try:
             self.player.set_output_device(
                 str(self.output_devices[self.output_device_index].id)
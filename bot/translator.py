@@ -1,6 +1,6 @@
 import gettext
 import os
-from typing import List
+from typing import Callable, List
 
 from bot import app_vars, errors
 
@@ -8,6 +8,7 @@ from bot import app_vars, errors
 class Translator:
     def __init__(self, language: str) -> None:
         self._locale = "en"
+        self._locale_listeners: List[Callable[[], None]] = []
         self.set_locale(language)
 
     def get_locale(self) -> str:
@@ -25,8 +26,14 @@ class Translator:
                 languages=[locale],
                 fallback=True,
             )
+            for listener in self._locale_listeners:
+                listener()
         else:
             raise errors.LocaleNotFoundError()
 
+    def add_locale_listener(self, listener: Callable[[], None]) -> None:
+        """Calls listener after every locale change."""
+        self._locale_listeners.append(listener)
+
     def translate(self, message: str) -> str:
         return self.translation.gettext(message)
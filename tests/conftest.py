@@ -0,0 +1,6 @@
+# O SDK do TeamTalk e a libmpv não existem no ambiente de testes: os módulos falsos
+# têm de estar em sys.modules antes de qualquer import do pacote bot
+from tests import fake_mpv, fake_teamtalk
+
+fake_mpv.install()
+fake_teamtalk.install()
@@ -0,0 +1,94 @@
+"""A stand-in mpv module, so the bot package imports without libmpv.
+
+MPV records the commands it gets, keeps the properties the player sets and
+follows the playlist commands; tests fire observers and event callbacks by hand.
+"""
+from __future__ import annotations
+import sys
+import types
+from typing import Any, Callable, Dict, List
+
+
+class MpvEventEndFile:
+    EOF = 0
+    STOP = 2
+    QUIT = 3
+    ERROR = 4
+    REDIRECT = 5
+
+
+class MpvEvent:
+    pass
+
+
+class MPV:
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.options = kwargs
+        self.commands: List[tuple] = []
+        self.event_callbacks: Dict[str, Callable[..., Any]] = {}
+        self.property_observers: Dict[str, Callable[..., Any]] = {}
+        self.idle_active = True
+        self.pause = False
+        self.volume = 100
+        self.speed = 1.0
+        self.time_pos = None
+        self.media_title = None
+        self.metadata = None
+        self.playlist: List[str] = []
+        self.playlist_pos = -1
+
+    def command(self, *args: Any) -> None:
+        self.commands.append(args)
+        if args[0] == "loadfile" and args[2:] == ("append",):
+            self.playlist.append(args[1])
+        elif args[0] == "playlist-remove":
+            del self.playlist[args[1]]
+            if args[1] <= self.playlist_pos:
+                self.playlist_pos -= 1
+
+    def play(self, url: str) -> None:
+        self.commands.append(("loadfile", url))
+        self.playlist = [url]
+        self.playlist_pos = 0
+        self.idle_active = False
+
+    def stop(self) -> None:
+        self.commands.append(("stop",))
+        self.playlist = []
+        self.playlist_pos = -1
+        self.idle_active = True
+
+    def next_entry(self) -> None:
+        """Goes on to the next playlist entry, as mpv does when a file ends."""
+        self.playlist_pos += 1
+        self.idle_active = self.playlist_pos >= len(self.playlist)
+
+    def seek(self, *args: Any) -> None:
+        self.commands.append(("seek",) + args)
+
+    def observe_property(self, name: str, handler: Callable[..., Any]) -> None:
+        self.property_observers[name] = handler
+
+    def event_callback(self, *event_types: str) -> Callable[..., Any]:
+        def register(callback: Callable[..., Any]) -> Callable[..., Any]:
+            for event_type in event_types:
+                self.event_callbacks[event_type] = callback
+            return callback
+
+        return register
+
+    def terminate(self) -> None:
+        pass
+
+
+def install() -> types.ModuleType:
+    """Put the fake mpv in sys.modules; call it before anything imports bot."""
+    module = sys.modules.get("mpv")
+    if getattr(module, "__fake__", False):
+        return module
+    module = types.ModuleType("mpv")
+    module.__dict__.update(
+        __fake__=True, MPV=MPV, MpvEvent=MpvEvent, MpvEventEndFile=MpvEventEndFile
+    )
+    sys.modules["mpv"] = module
+    return module
@@ -0,0 +1,107 @@
+"""A stand-in TeamTalkPy module, so the bot package imports without the SDK.
+
+Only what the tests drive behaves like the SDK: TeamTalk.insertAudioBlock records
+the AudioBlocks it gets. The enums hand out a new number for every name.
+"""
+from __future__ import annotations
+import ctypes
+import itertools
+import sys
+from threading import Condition
+import types
+from typing import List
+
+
+_values = itertools.count(1)
+
+
+class _Enum:
+    def __init__(self, **values: int) -> None:
+        self.__dict__.update(values)
+
+    def __getattr__(self, name: str) -> int:
+        value = next(_values)
+        setattr(self, name, value)
+        return value
+
+
+class AudioBlock(ctypes.Structure):
+    _fields_ = [
+        ("nStreamID", ctypes.c_int),
+        ("nSampleRate", ctypes.c_int),
+        ("nChannels", ctypes.c_int),
+        ("lpRawAudio", ctypes.c_void_p),
+        ("nSamples", ctypes.c_int),
+        ("uSampleIndex", ctypes.c_uint),
+        ("uStreamTypes", ctypes.c_uint),
+    ]
+
+
+class InsertedBlock:
+    def __init__(self, block: AudioBlock) -> None:
+        self.stream_id = block.nStreamID
+        self.sample_rate = block.nSampleRate
+        self.channels = block.nChannels
+        self.samples = block.nSamples
+        self.stream_types = block.uStreamTypes
+        # Copiado na hora, como o SDK faz: o buffer é liberado depois da chamada
+        self.data = ctypes.string_at(
+            block.lpRawAudio, block.nSamples * block.nChannels * 2
+        )
+
+
+class TeamTalk:
+    def __init__(self) -> None:
+        self.accept = True
+        self.blocks: List[InsertedBlock] = []
+        self._condition = Condition()
+
+    def insertAudioBlock(self, block: AudioBlock) -> int:
+        with self._condition:
+            self.blocks.append(InsertedBlock(block))
+            self._condition.notify_all()
+        return 1 if self.accept else 0
+
+    def wait_blocks(self, count: int, timeout: float = 5) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: len(self.blocks) >= count, timeout)
+
+
+def create_module() -> types.ModuleType:
+    module = types.ModuleType("TeamTalkPy")
+    module.__dict__.update(
+        getVersion=lambda: "5.15.0.1",
+        ttstr=lambda value: value,
+        setLicense=lambda name, key: None,
+        TeamTalk=TeamTalk,
+        AudioBlock=AudioBlock,
+        # Os mesmos valores do SDK: o bot compara o tipo da mensagem com 1 e 2
+        TextMsgType=_Enum(
+            MSGTYPE_USER=1, MSGTYPE_CHANNEL=2, MSGTYPE_BROADCAST=3, MSGTYPE_CUSTOM=4
+        ),
+        StreamType=_Enum(STREAMTYPE_VOICE=1),
+    )
+    for name in (
+        "ChannelType",
+        "ClientError",
+        "ClientEvent",
+        "ClientFlags",
+        "SoundSystem",
+        "UserRight",
+        "UserState",
+    ):
+        setattr(module, name, _Enum())
+    for name in ("Channel", "RemoteFile", "TextMessage", "TTMessage", "User", "UserAccount"):
+        setattr(module, name, type(name, (), {}))
+    return module
+
+
+def install() -> types.ModuleType:
+    """Put the fake SDK in sys.modules; call it before anything imports bot."""
+    module = sys.modules.get("TeamTalkPy")
+    if getattr(module, "__fake__", False):
+        return module
+    module = create_module()
+    module.__fake__ = True
+    sys.modules["TeamTalkPy"] = module
+    return module
@@ -0,0 +1,36 @@
+from __future__ import annotations
+from types import SimpleNamespace
+import unittest
+
+from tests import fake_mpv, fake_teamtalk
+
+fake_mpv.install()
+fake_teamtalk.install()
+
+from bot.TeamTalk.command_tracker import CommandTracker
+
+
+class CommandTrackerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tracker = CommandTracker()
+
+    def test_result_is_kept_until_claimed(self) -> None:
+        event = SimpleNamespace(source=7)
+        self.tracker.complete(event)
+        self.assertIs(self.tracker.expect(7).result(0), event)
+        self.assertEqual(self.tracker.stats["unclaimed"], 0)
+
+    def test_late_result_of_cancelled_command_is_dropped(self) -> None:
+        future = self.tracker.expect(7)
+        self.tracker.cancel(7)
+        self.assertTrue(future.cancelled())
+        self.assertEqual(self.tracker.stats["pending"], 0)
+        self.tracker.complete(SimpleNamespace(source=7))
+        self.assertEqual(self.tracker.stats["unclaimed"], 0)
+        self.assertEqual(self.tracker.stats["cancelled"], 0)
+        # Um comando novo com o mesmo id não recebe o resultado antigo
+        self.assertFalse(self.tracker.expect(7).done())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+from __future__ import annotations
+import os
+from threading import Thread
+from types import SimpleNamespace
+from typing import List
+import unittest
+
+from tests import fake_mpv, fake_teamtalk
+
+fake_mpv.install()
+TeamTalkPy = fake_teamtalk.install()
+
+from bot.config.models import SoundDevicesModel
+from bot.connectors.pcm_connector import PcmConnector
+from bot.player.pcm_output import SAMPLE_WIDTH, create_fifo, remove_fifo
+from bot.TeamTalk import TeamTalk
+
+
+SAMPLE_RATE = 8000
+CHANNELS = 2
+BLOCK_DURATION = 20
+FRAME_SIZE = SAMPLE_WIDTH * CHANNELS
+BLOCK_SIZE = SAMPLE_RATE * BLOCK_DURATION // 1000 * FRAME_SIZE
+
+
+class PcmConnectorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.path = create_fifo()
+        # O wrapper de verdade, só que falando com o SDK falso
+        self.ttclient = object.__new__(TeamTalk)
+        self.ttclient.tt = TeamTalkPy.TeamTalk()
+        bot = SimpleNamespace(
+            config=SimpleNamespace(
+                sound_devices=SoundDevicesModel(
+                    mode="pcm",
+                    pcm_sample_rate=SAMPLE_RATE,
+                    pcm_channels=CHANNELS,
+                    pcm_block_duration=BLOCK_DURATION,
+                )
+            ),
+            ttclient=self.ttclient,
+            player=SimpleNamespace(pcm_fifo_path=self.path),
+        )
+        self.connector = PcmConnector(bot)
+        self.connector.start()
+
+    def tearDown(self) -> None:
+        self.connector.close()
+        self.connector.join(5)
+        remove_fifo(self.path)
+
+    @property
+    def sdk(self) -> fake_teamtalk.TeamTalk:
+        return self.ttclient.tt
+
+    def write(self, chunks: List[bytes]) -> None:
+        # Como o mpv: abre o FIFO, escreve em pedaços de qualquer tamanho e fecha
+        def writer() -> None:
+            with open(self.path, "wb", buffering=0) as fifo:
+                for chunk in chunks:
+                    fifo.write(chunk)
+
+        thread = Thread(target=writer, daemon=True)
+        thread.start()
+        thread.join(5)
+
+    def test_blocks_have_whole_frames(self) -> None:
+        data = (bytes(range(256)) * (BLOCK_SIZE * 3 // 256 + 1))[: BLOCK_SIZE * 3]
+        # Pedaços que não coincidem com quadros nem com blocos
+        self.write([data[i : i + 7] for i in range(0, len(data), 7)])
+        self.assertTrue(self.sdk.wait_blocks(3))
+        self.assertEqual(b"".join(block.data for block in self.sdk.blocks), data)
+        for block in self.sdk.blocks:
+            self.assertEqual(len(block.data), BLOCK_SIZE)
+            self.assertEqual(block.sample_rate, SAMPLE_RATE)
+            self.assertEqual(block.channels, CHANNELS)
+        self.assertEqual(self.connector.stats["inserted_blocks"], 3)
+
+    def test_partial_block_is_flushed_when_mpv_stops_writing(self) -> None:
+        half_block = BLOCK_SIZE // 2
+        # Um bloco e meio, mais 3 bytes que não chegam a formar um quadro
+        self.write([b"\x01" * (BLOCK_SIZE + half_block) + b"\x02" * 3])
+        self.assertTrue(self.sdk.wait_blocks(2))
+        self.assertEqual(len(self.sdk.blocks[0].data), BLOCK_SIZE)
+        self.assertEqual(self.sdk.blocks[1].data, b"\x01" * half_block)
+        # O quadro incompleto espera o resto, para os canais não ficarem trocados
+        self.write([b"\x02" * (FRAME_SIZE - 3)])
+        self.assertTrue(self.sdk.wait_blocks(3))
+        self.assertEqual(self.sdk.blocks[2].data, b"\x02" * FRAME_SIZE)
+
+    def test_fifo_is_reopened_after_mpv_closes_it(self) -> None:
+        self.write([b"\x01" * BLOCK_SIZE])
+        self.assertTrue(self.sdk.wait_blocks(1))
+        self.write([b"\x02" * BLOCK_SIZE])
+        self.assertTrue(self.sdk.wait_blocks(2))
+        self.assertEqual(self.sdk.blocks[1].data, b"\x02" * BLOCK_SIZE)
+
+    def test_rejected_blocks_are_counted(self) -> None:
+        self.sdk.accept = False
+        self.write([b"\x01" * BLOCK_SIZE])
+        self.assertTrue(self.sdk.wait_blocks(1))
+        self.connector.close()
+        self.connector.join(5)
+        self.assertEqual(self.connector.stats["failed_blocks"], 1)
+        self.assertEqual(self.connector.stats["inserted_blocks"], 0)
+
+    def test_close_stops_the_thread_while_mpv_is_silent(self) -> None:
+        self.connector.close()
+        self.connector.join(5)
+        self.assertFalse(self.connector.is_alive())
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(self.sdk.blocks, [])
+
+
+class InsertAudioBlockTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.ttclient = object.__new__(TeamTalk)
+        self.ttclient.tt = TeamTalkPy.TeamTalk()
+
+    def test_block_describes_the_data(self) -> None:
+        data = bytes(range(256)) * 3
+        self.assertTrue(self.ttclient.supports_audio_blocks)
+        self.assertTrue(self.ttclient.insert_audio_block(data, 48000, 2))
+        (block,) = self.ttclient.tt.blocks
+        self.assertEqual(block.stream_id, 1)
+        self.assertEqual(block.sample_rate, 48000)
+        self.assertEqual(block.channels, 2)
+        # nSamples conta quadros, não bytes: 2 bytes por amostra em cada canal
+        self.assertEqual(block.samples, len(data) // 4)
+        self.assertEqual(block.stream_types, TeamTalkPy.StreamType.STREAMTYPE_VOICE)
+        self.assertEqual(block.data, data)
+
+    def test_mono_block(self) -> None:
+        data = b"\x01\x02" * 160
+        self.assertTrue(self.ttclient.insert_audio_block(data, 8000, 1))
+        self.assertEqual(self.ttclient.tt.blocks[0].samples, 160)
+        self.assertEqual(self.ttclient.tt.blocks[0].data, data)
+
+    def test_rejected_block(self) -> None:
+        self.ttclient.tt.accept = False
+        self.assertFalse(self.ttclient.insert_audio_block(b"\x00" * 4, 8000, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+import shutil
+import tempfile
+from types import SimpleNamespace
+import unittest
+
+from tests import fake_mpv, fake_teamtalk
+
+mpv = fake_mpv.install()
+fake_teamtalk.install()
+
+from bot.config.models import GeneralModel, PlayerModel, SoundDevicesModel
+from bot.player import Player
+from bot.player.enums import State
+from bot.player.track import Track
+from bot.positions import PositionStore
+
+
+class GaplessEndFileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.positions = PositionStore(self.directory)
+        bot = SimpleNamespace(
+            config=SimpleNamespace(
+                player=PlayerModel(gapless=True, prefetch_tracks=0),
+                general=GeneralModel(enable_positions=True),
+                sound_devices=SoundDevicesModel(),
+            ),
+            cache=SimpleNamespace(recents=[], add_to_recents=lambda track: None, queue=[]),
+            cache_manager=SimpleNamespace(positions=self.positions, save=lambda: None),
+        )
+        self.player = Player(bot)
+        self.mpv = self.player._player
+        # Uma faixa já resolvida, cujo link de stream pode expirar
+        self.first_track = Track("yt", "https://stream/1")
+        self.first_track._original_track = Track("yt", "https://page/1")
+        self.second_track = Track("yt", "https://stream/2")
+        self.player.play([self.first_track, self.second_track])
+        self.assertEqual(
+            self.mpv.commands[-1], ("loadfile", "https://stream/2", "append")
+        )
+        self.positions.update(self.first_track.position_key, 42, 100)
+
+    def tearDown(self) -> None:
+        self.positions.close()
+        shutil.rmtree(self.directory)
+
+    def end_file(self, reason: int) -> None:
+        # Na ordem do mpv: passa para a faixa anexada, avisa do fim do arquivo e só
+        # depois entrega a posição na playlist, com o valor que ela tem nessa hora
+        self.mpv.next_entry()
+        self.player.on_end_file({"event": {"reason": reason}})
+        self.player.on_playlist_pos("playlist-pos", self.mpv.playlist_pos)
+
+    def test_expired_stream_is_reloaded_instead_of_playing_the_next_track(self) -> None:
+        self.player.log_handler("error", "ffmpeg", "HTTP error 403 Forbidden")
+        commands = len(self.mpv.commands)
+        self.end_file(mpv.MpvEventEndFile.ERROR)
+        self.assertIs(self.player.track, self.first_track)
+        self.assertEqual(self.player.track_index, 0)
+        self.assertEqual(self.player.state, State.Playing)
+        # Resolvida de novo: o link da página, já que a faixa de teste não é dinâmica
+        self.assertIn(("loadfile", "https://page/1"), self.mpv.commands[commands:])
+        self.assertEqual(self.mpv.playlist, ["https://page/1", "https://stream/2"])
+        self.assertEqual(self.positions.get(self.first_track.position_key), (42, 100))
+
+    def test_failed_track_keeps_its_position(self) -> None:
+        self.end_file(mpv.MpvEventEndFile.ERROR)
+        self.assertIs(self.player.track, self.second_track)
+        self.assertEqual(self.player.track_index, 1)
+        self.assertEqual(self.mpv.playlist, ["https://stream/2"])
+        self.assertEqual(self.positions.get(self.first_track.position_key), (42, 100))
+
+    def test_finished_track_forgets_its_position(self) -> None:
+        self.end_file(mpv.MpvEventEndFile.EOF)
+        self.assertIs(self.player.track, self.second_track)
+        self.assertIsNone(self.positions.get(self.first_track.position_key))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Entry point of the yt-dlp extraction workers.
+
+Kept outside the bot package on purpose: spawned workers import only this module,
+yt_dlp and the standard library, never the TeamTalk SDK, libmpv or the bot itself.
+Errors go back to the bot as plain (status, message) tuples.
+"""
+from __future__ import annotations
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Optional, Tuple
+import urllib.error
+
+
+# Campos pesados do info dict que não são usados para tocar ou baixar a faixa
+unused_info_keys = (
+    "formats",
+    "thumbnails",
+    "thumbnail",
+    "automatic_captions",
+    "subtitles",
+    "requested_subtitles",
+    "heatmap",
+    "chapters",
+    "description",
+    "tags",
+    "categories",
+)
+
+
+def strip_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    for key in unused_info_keys:
+        info.pop(key, None)
+    return info
+
+
+def is_transport_error(error: Optional[BaseException]) -> bool:
+    """Tells a network failure or a server error from a bad or unavailable link.
+
+    yt-dlp wraps the original error, so the whole chain of causes is checked.
+    """
+    from yt_dlp.networking.exceptions import HTTPError, TransportError
+
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (HTTPError, urllib.error.HTTPError)):
+            status = getattr(error, "status", None) or getattr(error, "code", 0)
+            return status >= 500 or status == 429
+        if isinstance(error, (TransportError, OSError)):
+            return True
+        exc_info = getattr(error, "exc_info", None)
+        error = (
+            (exc_info[1] if exc_info else None)
+            or getattr(error, "cause", None)
+            or error.__cause__
+            or error.__context__
+        )
+    return False
+
+
+def worker_main(connection: Connection, ydl_config: Dict[str, Any]) -> None:
+    """Runs in the worker process: keeps one YoutubeDL and answers requests."""
+    from yt_dlp import YoutubeDL
+
+    ydl = YoutubeDL(ydl_config)
+    while True:
+        try:
+            method, arg = connection.recv()
+        except (EOFError, OSError):
+            break
+        try:
+            if method == "extract":
+                result = ydl.extract_info(arg, process=False)
+            else:
+                result = strip_info(ydl.process_ie_result(arg))
+            # Listas preguiçosas e objetos do yt-dlp não atravessam o pipe
+            response: Tuple[str, Any] = ("ok", YoutubeDL.sanitize_info(result))
+        except Exception as e:
+            status = "transport_error" if is_transport_error(e) else "error"
+            response = (status, str(e))
+        try:
+            connection.send(response)
+        except (EOFError, OSError):
+            break